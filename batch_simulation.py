@@ -0,0 +1,95 @@
+from logging import getLogger
+
+import numpy as np
+import scipy.sparse as sp
+
+from graph import UNTOUCHED, DEFENDED, BURNING
+from simulation import Score, saved_upper_bound
+
+logger = getLogger("simulation")
+
+
+def adjacency_matrix(graph):
+    data = np.ones(len(graph.indices), dtype=np.int32)
+    return sp.csr_matrix((data, graph.indices, graph.indptr), shape=(graph.nodes_number, graph.nodes_number))
+
+
+def threatened_nodes(adjacency, states, ignited):
+    """ Batched simulation.threatened_nodes, arguments and result are (population x nodes) matrices """
+    rows, columns = sp.csr_matrix(ignited, dtype=np.int32).dot(adjacency).nonzero()
+    threatened = np.zeros(states.shape, dtype=bool)
+    threatened[rows, columns] = True
+    threatened &= states == UNTOUCHED
+    return threatened
+
+
+def assign_firefighters(states, solutions, n, active, read_lengths):
+    """ Batched simulation.assign_firefighters, defends up to n nodes in each of the active rows.
+
+        Nodes skipped by the solution index never become untouched again, so the first n untouched nodes
+        in solution order are exactly the ones the sequential version would defend.
+        read_lengths is updated with the number of solution entries the sequential version would have read.
+    """
+    rows = np.arange(len(states))[:, np.newaxis]
+    untouched = (states[rows, solutions] == UNTOUCHED) & active[:, np.newaxis]
+    chosen = untouched & (np.cumsum(untouched, axis=1) <= n)
+    states[np.nonzero(chosen)[0], solutions[chosen]] = DEFENDED
+
+    # rows that placed all n firefighters have read up to the last defended node, the others the whole solution
+    length = solutions.shape[1]
+    last_chosen = length - np.argmax(chosen[:, ::-1], axis=1)
+    read_lengths[active] = np.where(chosen.sum(axis=1) == n, last_chosen, length)[active]
+
+
+def simulation_scores(graph, solutions, ff_per_step, threshold=None):
+    """ Simulates all solutions at once, keeping (population x nodes) matrix of node states.
+        Every step is done for all the specimens together, rows that have already finished are left intact.
+
+    :param solutions: list of permutations of node ids, all of the same length
+    :param threshold: number of saved nodes, rows that can't reach it are aborted (see Score.pruned)
+    :return: list of Score, in order of solutions
+    """
+    if not len(solutions):
+        return []
+    solutions = np.asarray(solutions, dtype=np.int32)
+    adjacency = adjacency_matrix(graph)
+
+    states = np.full((len(solutions), graph.nodes_number), UNTOUCHED, dtype=np.uint8)
+    ignited = np.zeros(states.shape, dtype=bool)
+    ignited[:, graph.init_nodes_ids] = True
+    states[ignited] = BURNING
+    threatened = threatened_nodes(adjacency, states, ignited)
+
+    iterations = np.zeros(len(solutions), dtype=np.int32)
+    read_lengths = np.zeros(len(solutions), dtype=np.int32)
+    burned = np.count_nonzero(ignited, axis=1)
+    pruned = np.zeros(len(solutions), dtype=bool)
+    upper_bounds = np.zeros(len(solutions), dtype=np.int64)
+    active = threatened.any(axis=1)
+    while active.any():
+        if threshold is not None:
+            bounds = saved_upper_bound(graph.nodes_number, burned, np.count_nonzero(threatened, axis=1), ff_per_step)
+            to_prune = active & (bounds < threshold)
+            pruned |= to_prune
+            upper_bounds[to_prune] = bounds[to_prune]
+            threatened[to_prune] = False
+            active &= ~to_prune
+            if not active.any():
+                break
+        assign_firefighters(states, solutions, ff_per_step, active, read_lengths)
+        ignited = threatened & (states == UNTOUCHED)
+        states[ignited] = BURNING
+        burned += np.count_nonzero(ignited, axis=1)
+        threatened = threatened_nodes(adjacency, states, ignited)
+        iterations += active
+        active = threatened.any(axis=1)
+
+    saved_ff = np.count_nonzero(states == DEFENDED, axis=1)
+    saved = np.where(pruned, upper_bounds, saved_ff + np.count_nonzero(states == UNTOUCHED, axis=1))
+    logger.info("Simulated {} solutions in {} iterations, {} pruned".format(len(solutions), iterations.max(),
+                                                                           np.count_nonzero(pruned)))
+
+    return [Score(t, all_saved, ff, read_length, is_pruned)
+            for t, all_saved, ff, read_length, is_pruned in zip(iterations.tolist(), saved.tolist(),
+                                                                saved_ff.tolist(), read_lengths.tolist(),
+                                                                pruned.tolist())]
@@ -0,0 +1,94 @@
+import argparse
+import os
+import tempfile
+import time
+from logging import getLogger
+
+import numpy as np
+
+from graph import Graph, text_to_binary
+from logging_configs import configure_logging
+
+logger = getLogger("benchmark_results")
+
+# edges formatted at once while writing the benchmark file
+_WRITE_CHUNK = 10 ** 6
+
+
+def write_random_graph(path, nodes_number, edges_number):
+    """ Text graph file with uniformly random edges (duplicates and loops are not filtered out) """
+    with open(path, 'w') as f:
+        f.write("{} {}\n0 \n".format(nodes_number, edges_number))
+        for start in xrange(0, edges_number, _WRITE_CHUNK):
+            edges = np.random.randint(0, nodes_number, size=(min(_WRITE_CHUNK, edges_number - start), 2))
+            f.write("\n".join("{} {}".format(v1, v2) for v1, v2 in edges.tolist()))
+            f.write("\n")
+
+
+def _timed(function, *args):
+    start = time.time()
+    result = function(*args)
+    return time.time() - start, result
+
+
+def benchmark(path, by_lines=True):
+    """ Times loading of a text graph file with each loader
+
+    :return: list of (loader name, seconds)
+    """
+    results = list()
+    if by_lines:
+        seconds, expected = _timed(Graph.from_file_by_lines, path)
+        results.append(("by lines", seconds))
+    else:
+        expected = None
+
+    seconds, graph = _timed(Graph.from_file, path)
+    results.append(("bulk", seconds))
+    if expected is not None:
+        assert (graph.indptr == expected.indptr).all() and (graph.indices == expected.indices).all(), \
+            "bulk loader built different graph"
+    del graph, expected
+
+    binary_path = path + ".bgraph"
+    try:
+        seconds, _ = _timed(text_to_binary, path, binary_path)
+        results.append(("to binary", seconds))
+        seconds, _ = _timed(Graph.from_file, binary_path)
+        results.append(("binary", seconds))
+    finally:
+        os.remove(binary_path)
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-in', '--input_file', help='text graph file, random graphs are generated if not given')
+    parser.add_argument('-e', '--edges', help='numbers of edges of generated graphs', type=int, nargs='+',
+                        default=[10 ** 6, 10 ** 7])
+    parser.add_argument('-v', '--vertices', help='number of vertices of generated graphs', type=int, default=10 ** 6)
+    parser.add_argument('-nl', '--no_lines', help='skip the line by line parser (slow and memory hungry)',
+                        action='store_true')
+    args = parser.parse_args()
+
+    configure_logging("benchmark_results=info")
+
+    if args.input_file:
+        inputs = [(args.input_file, None)]
+    else:
+        inputs = list()
+        for edges_number in args.edges:
+            handle, path = tempfile.mkstemp(suffix='.rgraph')
+            os.close(handle)
+            write_random_graph(path, args.vertices, edges_number)
+            inputs.append((path, edges_number))
+
+    logger.info("{:>12} {:>10} {:>10}".format("EDGES", "LOADER", "SECONDS"))
+    for path, edges_number in inputs:
+        try:
+            for loader, seconds in benchmark(path, not args.no_lines):
+                logger.info("{:>12} {:>10} {:>10.3f}".format(edges_number or path, loader, seconds))
+        finally:
+            if edges_number is not None:
+                os.remove(path)
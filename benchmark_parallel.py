@@ -0,0 +1,76 @@
+import argparse
+import random
+import time
+from logging import getLogger
+from multiprocessing import cpu_count
+
+from evaluation_pool import EvaluationPool
+from generate import load_graph
+from graph import Graph
+from logging_configs import configure_logging
+from simulation import simulation_score
+
+logger = getLogger("benchmark_results")
+
+
+def _workers_counts(max_workers):
+    counts = list()
+    workers = 1
+    while workers < max_workers:
+        counts.append(workers)
+        workers *= 2
+    return counts + [max_workers]
+
+
+def benchmark(graph, population_size, ff_per_step, max_workers, repeats):
+    """ Times scoring of a random population in the main process and with pools of growing size
+
+    :return: list of (workers, seconds), 0 workers stands for scoring in the main process
+    """
+    population = [random.sample(xrange(graph.nodes_number), graph.nodes_number) for _ in xrange(population_size)]
+
+    start = time.time()
+    for _ in xrange(repeats):
+        expected = [str(simulation_score(graph, specimen, ff_per_step)) for specimen in population]
+    results = [(0, (time.time() - start) / repeats)]
+
+    for workers in _workers_counts(max_workers):
+        pool = EvaluationPool(graph, workers)
+        try:
+            # first call warms up the workers
+            scores = pool.simulation_scores(population, ff_per_step)
+            start = time.time()
+            for _ in xrange(repeats):
+                scores = pool.simulation_scores(population, ff_per_step)
+            results.append((workers, (time.time() - start) / repeats))
+        finally:
+            pool.close()
+        assert map(str, scores) == expected, "parallel scores differ from sequential ones"
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-in', '--input_file', help='file containing graph')
+    parser.add_argument('-v', '--vertices', help='number of vertices in graph', type=int, default=2000)
+    parser.add_argument('-d', '--density', help='edges density; float in range [0..1]', type=float, default=0.002)
+    parser.add_argument('-s', '--starting_vertices', help='number of starting vertices', type=int, default=1)
+    parser.add_argument('-f', '--ffs', help='number of firefighters per step', type=int, default=2)
+    parser.add_argument('-p', '--population_size', help='number of specimens scored', type=int, default=200)
+    parser.add_argument('-w', '--max_workers', help='largest pool size', type=int, default=cpu_count())
+    parser.add_argument('-r', '--repeats', help='number of timed repetitions', type=int, default=3)
+    args = parser.parse_args()
+
+    configure_logging("benchmark_results=info")
+
+    if args.input_file:
+        g = Graph.from_file(args.input_file)
+    else:
+        g = load_graph(args.vertices, args.density, args.starting_vertices)
+
+    timings = benchmark(g, args.population_size, args.ffs, args.max_workers, args.repeats)
+    sequential_time = timings[0][1]
+    logger.info("{:>8} {:>10} {:>8}".format("WORKERS", "SECONDS", "SPEEDUP"))
+    for workers, seconds in timings:
+        logger.info("{:>8} {:>10.4f} {:>8.2f}".format(workers, seconds, sequential_time / seconds))
@@ -0,0 +1,116 @@
+from logging import getLogger, INFO
+
+import numpy as np
+
+from simulation import Score, saved_upper_bound
+
+logger = getLogger("simulation")
+
+# number of set bits of every byte value
+_POPCOUNT = np.array([bin(byte).count('1') for byte in xrange(256)], dtype=np.uint8)
+
+
+def _locate(node_ids):
+    """ Byte index and bit mask of given nodes in a bitset """
+    return node_ids >> 3, (1 << (node_ids & 7)).astype(np.uint8)
+
+
+class BitsetState(object):
+    """ Node states of a single simulation packed into two bitsets - burning and defended nodes,
+        which takes 2 bits per node. Node is untouched if it's in neither of them.
+
+        Each bitset is a bytearray (fast access to single nodes) shared with a NumPy view (vectorized access
+        to many nodes at once).
+    """
+
+    def __init__(self, nodes_number):
+        size = (nodes_number + 7) // 8
+        self._burning = bytearray(size)
+        self._defended = bytearray(size)
+        self.burning = np.frombuffer(self._burning, dtype=np.uint8)
+        self.defended = np.frombuffer(self._defended, dtype=np.uint8)
+
+    def is_untouched(self, node_id):
+        return not ((self._burning[node_id >> 3] | self._defended[node_id >> 3]) >> (node_id & 7)) & 1
+
+    def untouched(self, node_ids):
+        """ :return: boolean mask of untouched nodes among node_ids """
+        byte, bit = _locate(node_ids)
+        return ((self.burning[byte] | self.defended[byte]) & bit) == 0
+
+    def defend(self, node_id):
+        self._defended[node_id >> 3] |= 1 << (node_id & 7)
+
+    def burn(self, node_ids):
+        byte, bit = _locate(node_ids)
+        np.bitwise_or.at(self.burning, byte, bit)
+
+    def count_burning(self):
+        return int(_POPCOUNT[self.burning].sum(dtype=np.int64))
+
+    def count_defended(self):
+        return int(_POPCOUNT[self.defended].sum(dtype=np.int64))
+
+
+def set_initial_nodes_on_fire(graph, state):
+    state.burn(graph.init_nodes_ids)
+    return threatened_nodes(graph, state, graph.init_nodes_ids)
+
+
+def threatened_nodes(graph, state, ignited):
+    """ Same as simulation.threatened_nodes """
+    neighbors = graph.neighbors_of(ignited)
+    return neighbors[state.untouched(neighbors)]
+
+
+def assign_firefighters(state, solution, solution_index, n):
+    """ Same as simulation.assign_firefighters """
+    placed_ff = 0
+    while placed_ff < n and solution_index < len(solution):
+        node_id = solution[solution_index]
+        if state.is_untouched(node_id):
+            state.defend(node_id)
+            placed_ff += 1
+        else:
+            solution_index += 1
+    return solution_index
+
+
+def spread_fire(graph, state, threatened):
+    """ Same as simulation.spread_fire """
+    ignited = np.unique(threatened[state.untouched(threatened)])
+    state.burn(ignited)
+
+    return ignited, threatened_nodes(graph, state, ignited)
+
+
+def simulation_score(graph, solution, ff_per_step, threshold=None):
+    """ simulation.simulation_score with node states kept in a BitsetState """
+    state = BitsetState(graph.nodes_number)
+    threatened = set_initial_nodes_on_fire(graph, state)
+    burned = state.count_burning()
+
+    solution_index = 0
+    iterations = 0
+    pruned = False
+    while threatened.size:
+        if threshold is not None:
+            upper_bound = saved_upper_bound(graph.nodes_number, burned, np.unique(threatened).size, ff_per_step)
+            if upper_bound < threshold:
+                pruned = True
+                break
+        solution_index = assign_firefighters(state, solution, solution_index, ff_per_step)
+        ignited, threatened = spread_fire(graph, state, threatened)
+        burned += ignited.size
+        iterations += 1
+
+    # the entry at solution_index was read as well, unless the solution has been exhausted
+    read_length = min(solution_index + 1, len(solution)) if iterations else 0
+
+    saved_ff = state.count_defended()
+    all_saved = int(upper_bound) if pruned else graph.nodes_number - burned
+    if logger.isEnabledFor(INFO):
+        logger.info("It took {} iterations for the fire to stop spreading".format(iterations))
+        logger.info("Result: {} (saved nodes, from them {} occupied by firefighters)".format(all_saved, saved_ff))
+
+    return Score(iterations, all_saved, saved_ff, read_length, pruned)
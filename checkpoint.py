@@ -0,0 +1,58 @@
+import os
+import pickle
+import tempfile
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+
+def save_checkpoint(path, specimens, score_columns, state):
+    """ Writes a checkpoint atomically - to a temporary file, which then replaces the one at path,
+        so a crash in the middle of writing leaves the previous checkpoint intact.
+
+    :param specimens: list of permutations of node ids (all of the same length) or 2D array of them,
+        stored packed in the smallest unsigned integer type that fits the node ids
+    :param score_columns: dict name -> 1D array, one entry per specimen
+    :param state: anything picklable (iteration number, random states, stop condition, ...)
+    """
+    specimens = np.array(specimens, ndmin=2)
+    nodes_number = specimens.shape[1]
+    packed = specimens.astype(np.min_scalar_type(max(nodes_number - 1, 0)))
+
+    arrays = dict(('score_' + name, np.asarray(column)) for name, column in score_columns.iteritems())
+    arrays['specimens'] = packed
+    arrays['state'] = np.frombuffer(pickle.dumps((FORMAT_VERSION, state), pickle.HIGHEST_PROTOCOL), dtype=np.uint8)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, temporary_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path), suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as f:
+            np.savez(f, **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(temporary_path, path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+    _fsync_directory(directory)
+
+
+def _fsync_directory(directory):
+    """ Makes the rename durable, it's an entry of the directory """
+    handle = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(handle)
+    finally:
+        os.close(handle)
+
+
+def load_checkpoint(path):
+    """ :return: (specimens as int32 2D array, dict of score columns, state) """
+    with np.load(path) as data:
+        version, state = pickle.loads(data['state'].tostring())
+        if version != FORMAT_VERSION:
+            raise ValueError('Unsupported checkpoint format version {} in {}'.format(version, path))
+        specimens = data['specimens'].astype(np.int32)
+        score_columns = dict((name[len('score_'):], data[name]) for name in data.files if name.startswith('score_'))
+    return specimens, score_columns, state
@@ -0,0 +1,42 @@
+from multiprocessing import Pool
+
+from simulation import simulation_score
+
+# graph and scoring function of the worker process, set once by the pool initializer
+_graph = None
+_score_function = None
+
+
+def _init_worker(graph, score_function):
+    global _graph, _score_function
+    _graph = graph
+    _score_function = score_function
+
+
+def _simulation_score(args):
+    solution, ff_per_step, threshold = args
+    return _score_function(_graph, solution, ff_per_step, threshold=threshold)
+
+
+class EvaluationPool(object):
+    """ Pool of processes scoring solutions for a single graph.
+        Graph is handed to each worker once, when the worker starts (with fork it's not even copied),
+        only solutions and scores are sent afterwards.
+    """
+
+    def __init__(self, graph, workers, score_function=simulation_score):
+        """
+        :param score_function: module level function with signature of simulation.simulation_score
+        """
+        self.workers = workers
+        self._pool = Pool(workers, initializer=_init_worker, initargs=(graph, score_function))
+
+    def simulation_scores(self, solutions, ff_per_step, threshold=None):
+        """ Same as batch_simulation.simulation_scores, scores are returned in order of solutions """
+        chunksize = len(solutions) // (4 * self.workers) + 1
+        return self._pool.map(_simulation_score, [(solution, ff_per_step, threshold) for solution in solutions],
+                              chunksize)
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
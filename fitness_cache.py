@@ -0,0 +1,113 @@
+from bisect import insort
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+DEFAULTS = {
+    'capacity': 10 ** 6,
+}
+
+
+class FitnessCache(object):
+    """ LRU cache of simulation scores.
+
+        A simulation reads only first Score.read_length entries of the solution, so any solution starting with
+        the same entries has the same score. Entries are keyed with such a prefix, normalized by dropping
+        initial fire nodes (they are always burning, so they are always skipped). Many mutated specimens differ
+        from their parents only past the read prefix and can be scored without a simulation.
+
+        Prefixes are hashed with a sum of random 64-bit values of (position, node id) pairs, so hashes of all
+        prefixes of a solution are a single cumulative sum and each stored key length is probed with one dict
+        lookup. A lookup costs O(longest stored key) vectorized work plus O(distinct key lengths) probes.
+
+        Cache is valid for a single graph and number of firefighters per step.
+
+    Attributes
+        capacity: maximum total length of the stored keys (in node ids), which bounds the memory used
+        hits, misses: number of lookups that did / didn't find the score
+    """
+
+    def __init__(self, graph, capacity=DEFAULTS['capacity']):
+        self.capacity = capacity
+        self.ignored_nodes = frozenset(graph.init_nodes_ids.tolist())
+        self._ignored = np.zeros(graph.nodes_number, dtype=np.bool_)
+        self._ignored[graph.init_nodes_ids] = True
+
+        # own random state, the global ones drive the algorithm
+        state = np.random.RandomState(0)
+        self._node_values = state.randint(0, 2 ** 62, size=graph.nodes_number, dtype=np.int64).view(np.uint64)
+        self._position_values = state.randint(0, 2 ** 62, size=graph.nodes_number, dtype=np.int64).view(np.uint64)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # (key length, key hash) -> (key, Score)
+        self._entries = OrderedDict()
+        self._size = 0
+        # how many keys of each length are stored, lookups try all of them
+        self._key_lengths = Counter()
+        self._sorted_lengths = list()
+
+    def _normalize(self, solution, length=None):
+        """ :return: int64 array of the first length entries of solution without initial fire nodes """
+        solution = np.asarray(solution[:length], dtype=np.int64)
+        return solution[~self._ignored[solution]]
+
+    def _prefix_hashes(self, key):
+        """ Hashes of all prefixes of key, the hash of key[:length] is at index length - 1 """
+        return np.cumsum(self._node_values[key] * self._position_values[:len(key)], dtype=np.uint64)
+
+    def get(self, solution):
+        """ :return: cached Score or None """
+        if not self._sorted_lengths:
+            self.misses += 1
+            return None
+
+        # ignored nodes appear only once in a solution, so this is enough to get the longest key
+        normalized = self._normalize(solution, self._sorted_lengths[-1] + len(self.ignored_nodes))
+        hashes = self._prefix_hashes(normalized)
+        for length in self._sorted_lengths:
+            if length > len(normalized):
+                break
+            entry_key = (length, int(hashes[length - 1]) if length else 0)
+            entry = self._entries.pop(entry_key, None)
+            if entry is None:
+                continue
+            self._entries[entry_key] = entry
+            key, score = entry
+            if np.array_equal(key, normalized[:length]):
+                self.hits += 1
+                return score
+        self.misses += 1
+        return None
+
+    def put(self, solution, score):
+        key = self._normalize(solution, score.read_length)
+        entry_key = (len(key), int(self._prefix_hashes(key)[-1]) if len(key) else 0)
+        if entry_key in self._entries or len(key) > self.capacity:
+            return
+        self._entries[entry_key] = (key, score)
+        self._size += len(key)
+        self._add_length(len(key), 1)
+
+        while self._size > self.capacity:
+            (evicted_length, _), _ = self._entries.popitem(last=False)
+            self._size -= evicted_length
+            self._add_length(evicted_length, -1)
+            self.evictions += 1
+
+    def _add_length(self, length, count):
+        self._key_lengths[length] += count
+        if not self._key_lengths[length]:
+            del self._key_lengths[length]
+            self._sorted_lengths.remove(length)
+        elif self._key_lengths[length] == count:
+            insort(self._sorted_lengths, length)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __str__(self):
+        return "hits: {}, misses: {}, evictions: {}, entries: {}".format(self.hits, self.misses, self.evictions,
+                                                                          len(self))
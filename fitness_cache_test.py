@@ -0,0 +1,101 @@
+""" Checks FitnessCache against a plain scan of stored prefixes, and that its lookups stay much cheaper
+    than the simulations they replace.
+"""
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from fitness_cache import FitnessCache
+from generate import generate_family_file, generate_file_data
+from graph import Graph
+from simulation import simulation_score
+
+
+class ReferenceCache(object):
+    """ Unbounded cache, that compares the solution with every stored prefix """
+
+    def __init__(self, graph):
+        self.ignored_nodes = frozenset(graph.init_nodes_ids.tolist())
+        self.entries = dict()
+
+    def _normalize(self, solution, length=None):
+        return tuple(node_id for node_id in solution[:length] if node_id not in self.ignored_nodes)
+
+    def get(self, solution):
+        normalized = self._normalize(solution)
+        for key in sorted(self.entries, key=len):
+            if normalized[:len(key)] == key:
+                return self.entries[key]
+        return None
+
+    def put(self, solution, score):
+        self.entries.setdefault(self._normalize(solution, score.read_length), score)
+
+
+def _check_against_reference(graph, ff_per_step, lookups):
+    cache, reference = FitnessCache(graph, 10 ** 9), ReferenceCache(graph)
+    base = range(graph.nodes_number)
+    random.shuffle(base)
+    for _ in xrange(lookups):
+        solution = list(base)
+        for _ in xrange(random.randint(0, 3)):
+            i, j = random.randrange(len(solution)), random.randrange(len(solution))
+            solution[i], solution[j] = solution[j], solution[i]
+        if random.random() < 0.1:
+            random.shuffle(solution)
+
+        score, expected = cache.get(solution), reference.get(solution)
+        assert (score is None) == (expected is None), "cache and reference disagree on {}".format(solution)
+        if score is None:
+            score = simulation_score(graph, solution, ff_per_step)
+            cache.put(solution, score)
+            reference.put(solution, score)
+        else:
+            assert score is expected, "cache returned a score of another solution for {}".format(solution)
+
+
+def _mean_seconds(function, arguments):
+    start = time.time()
+    for argument in arguments:
+        function(argument)
+    return (time.time() - start) / len(arguments)
+
+
+def _check_timing(graph, ff_per_step, entries):
+    """ Lookups (misses included) in a cache full of long keys have to be far cheaper than simulations """
+    cache = FitnessCache(graph, 10 ** 9)
+    stored = list()
+    for _ in xrange(entries):
+        solution = range(graph.nodes_number)
+        random.shuffle(solution)
+        cache.put(solution, simulation_score(graph, solution, ff_per_step))
+        stored.append(solution)
+
+    probes = stored[:20]
+    for solution in probes:
+        random.shuffle(solution)
+    simulation_seconds = _mean_seconds(lambda solution: simulation_score(graph, solution, ff_per_step), probes)
+    miss_seconds = _mean_seconds(cache.get, probes)
+    print "simulation: {:.5f}s, cache miss: {:.5f}s".format(simulation_seconds, miss_seconds)
+    assert miss_seconds < simulation_seconds / 4, "cache lookups cost too much compared to simulations"
+
+
+if __name__ == '__main__':
+
+    random.seed(1)
+    directory = tempfile.mkdtemp()
+
+    try:
+        random_graph_file = os.path.join(directory, 'random.rgraph')
+        generate_file_data(random_graph_file, 300, 0.02, 3)
+        _check_against_reference(Graph.from_file(random_graph_file), 2, 5000)
+
+        grid_file = os.path.join(directory, 'grid.bgraph')
+        generate_family_file(grid_file, 'grid', 40000, 3, binary=True, seed=1)
+        _check_timing(Graph.from_file(grid_file), 2, 300)
+    finally:
+        shutil.rmtree(directory)
+
+    print "Fitness cache matches the reference and is cheaper than simulations"
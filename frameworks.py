@@ -1,6 +1,18 @@
+import random
+import time
+from functools import partial
 from logging import getLogger, INFO
 
-from simulation import simulation
+import numpy as np
+
+import bitset_simulation
+from batch_simulation import simulation_scores
+from checkpoint import save_checkpoint, load_checkpoint
+from evaluation_pool import EvaluationPool
+from operator_adapter import population_scores
+from population_matrix import PopulationMatrix
+from simulation import simulation, simulation_score, simulation_trace
+from steady_state import SteadyStatePopulation
 from visualize import visualize_simulation
 from heapq import nlargest
 
@@ -8,7 +20,8 @@ algo_vis_last_logger = getLogger("algo_vis_last")
 new_solution_logger = getLogger("new_solution")
 algo_populations_logger = getLogger("algo_populations")
 algo_per_iter_stats_logger = getLogger("per_iter_stats")
-per_iter_stats_format = "{:>10} {:>10} {:>12} {:>10}"
+fitness_cache_logger = getLogger("fitness_cache")
+per_iter_stats_format = "{:>10} {:>10} {:>12} {:>10} {:>10}"
 
 SHOW_SCORE_EVERY = 1
 SORT_POPULATION = False
@@ -24,7 +37,7 @@ def strip_score(list):
 
 
 def random_population(es, size):
-    all_node_ids = es.params.G.get_nodes().keys()
+    all_node_ids = range(es.params.G.nodes_number)
     population = []
     for i in xrange(size):
         population.append(all_node_ids)
@@ -33,9 +46,25 @@ def random_population(es, size):
 
 # sort list by scores desc
 def sort_by_score(solutions):
+    if isinstance(solutions, PopulationMatrix):
+        return solutions.sorted()
     return sorted(solutions, key=lambda (sol, score): score.to_fitness(), reverse=True)
 
 
+def _fitness_sum(population):
+    if isinstance(population, PopulationMatrix):
+        return population.fitness_sum()
+    return sum(map(lambda (_, score): score.perc_saved_nodes, population))
+
+
+def _copy_specimen(specimen):
+    return specimen.copy() if isinstance(specimen, np.ndarray) else list(specimen)
+
+
+def _specimen_key(specimen):
+    return specimen.tostring() if isinstance(specimen, np.ndarray) else tuple(specimen)
+
+
 def find_n_best_solutions(population, n=1):
     return nlargest(n, population, key=lambda (specimen, score): score.to_fitness())
 
@@ -57,9 +86,19 @@ class Operators(object):
         mutation: (es, specimen) -> specimen
             executed for copy of each specimen returned by mutation_selector
             doesn't need to copy specimen, can modify it in-place
+        batch_mutation: (es, list(specimen)) -> list(specimen) or None
+            executed once per iteration, for all specimens returned by mutation_selector at once
+            must not modify given specimens; if it returns None, mutation is used for each of them instead
         succession: (es) -> list(specimen)
             executed once per operation
             can expect population to be in sorted state, but doesn't have to return it in sorted state
+        survival_threshold: (es) -> fitness or None
+            executed once per iteration, before crossover
+            fitness below which a new specimen is certain not to survive the succession,
+            evaluation of such specimens is aborted early and they get only an upper bound of their score
+        migration: (es) -> list((specimen, AlgoScore))
+            executed once per iteration, after succession
+            exchanges specimens with other populations (see islands), returns the new population
 
     Framework makes no assumptions about:
     * population size or that it's constant
@@ -79,8 +118,9 @@ class Operators(object):
     Population state (if SORT POPULATION == False):
     * nothing is sorted, you have to sort it yourself if you need it
 
-    Children are scored as soon as possible. This mean that they are available (with score) for subsequent invocatins
-    of crossover & mutation.
+    Children from crossover and mutation are scored together in a single evaluation stage, after all crossovers
+    and mutations of an iteration are done. Each distinct specimen is scored only once. This mean that they are not
+    available with score for crossover & mutation, only for succession.
 
     """
 
@@ -107,15 +147,28 @@ class Operators(object):
         # print "default mutation op"
         return specimen
 
+    def batch_mutation(self, es, specimens):
+        return None
+
     def succession(self, es):
         # print "default succession op"
         return es.population
 
+    def survival_threshold(self, es):
+        return None
+
+    def migration(self, es):
+        return es.population
+
 
 class AlgoScore(object):
-    def __init__(self, perc_saved_nodes, perc_saved_occupied_by_ff):
+    def __init__(self, perc_saved_nodes, perc_saved_occupied_by_ff, trace=None, pruned=False):
         self.perc_saved_nodes = perc_saved_nodes
         self.perc_saved_occupied_by_ff = perc_saved_occupied_by_ff
+        # evaluation was aborted below survival threshold, perc_saved_nodes is only an upper bound
+        self.pruned = pruned
+        # simulation.Trace of the scored specimen, recorded only for incremental evaluation
+        self.trace = trace
 
     def to_fitness(self):
         return self.perc_saved_nodes
@@ -143,6 +196,102 @@ class IterBoundSC(StopCondition):
         return i < self.iter_no
 
 
+class WallClockSC(StopCondition):
+    """ Stops once given number of seconds passed since the first check (start of the first iteration) """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.deadline = None
+
+    def should_continue(self, i, es):
+        if self.deadline is None:
+            self.deadline = time.time() + self.seconds
+        return time.time() < self.deadline
+
+    def __getstate__(self):
+        # checkpoints keep the remaining time, a resumed run continues the countdown
+        state = dict(self.__dict__)
+        if self.deadline is not None:
+            state['deadline'] = self.deadline - time.time()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.deadline is not None:
+            self.deadline += time.time()
+
+
+class EvaluationBudgetSC(StopCondition):
+    """ Stops once given number of specimens were scored (including initial population) """
+
+    def __init__(self, max_evaluations):
+        self.max_evaluations = max_evaluations
+
+    def should_continue(self, i, es):
+        return es.total_evaluations < self.max_evaluations
+
+
+def _best_fitness(es):
+    if es.best is not None:
+        _, score = es.best
+    elif es.population:
+        _, score = find_n_best_solutions(es.population, 1)[0]
+    else:
+        return None
+    return score.to_fitness()
+
+
+class StagnationSC(StopCondition):
+    """ Stops once best fitness didn't improve by more than min_improvement for given number of iterations """
+
+    def __init__(self, iterations, min_improvement=0.0):
+        self.iterations = iterations
+        self.min_improvement = min_improvement
+        self.best_fitness = None
+        self.stagnant_iterations = 0
+
+    def should_continue(self, i, es):
+        best_fitness = _best_fitness(es)
+        if self.best_fitness is None or best_fitness > self.best_fitness + self.min_improvement:
+            self.best_fitness = best_fitness
+            self.stagnant_iterations = 0
+        elif i > 0:
+            self.stagnant_iterations += 1
+        return self.stagnant_iterations < self.iterations
+
+
+class TargetFitnessSC(StopCondition):
+    """ Stops once any specimen reached given fitness """
+
+    def __init__(self, target_fitness):
+        self.target_fitness = target_fitness
+
+    def should_continue(self, i, es):
+        best_fitness = _best_fitness(es)
+        return best_fitness is None or best_fitness < self.target_fitness
+
+
+class AnySC(StopCondition):
+    """ Stops once any of the conditions says so """
+
+    def __init__(self, *conditions):
+        self.conditions = conditions
+
+    def should_continue(self, i, es):
+        # every condition is checked, as some of them track the progress between calls
+        return all([condition.should_continue(i, es) for condition in self.conditions])
+
+
+class AllSC(StopCondition):
+    """ Stops once all of the conditions say so """
+
+    def __init__(self, *conditions):
+        self.conditions = conditions
+
+    def should_continue(self, i, es):
+        return any([condition.should_continue(i, es) for condition in self.conditions])
+
+
 class AlgoIn(object):
     def __init__(self,
                  G,
@@ -150,43 +299,155 @@ class AlgoIn(object):
                  iter_no=DEFAULTS["algo_iter_no"],
                  ffs_per_step=DEFAULTS["ffs_per_step"],
                  gather_iteration_stats=False,
-                 stop_condition=None
+                 stop_condition=None,
+                 batch_evaluation=False,
+                 fitness_cache=None,
+                 incremental_evaluation=False,
+                 workers=0,
+                 bitset_states=False,
+                 steady_state=False,
+                 population_matrix=False,
+                 checkpoint_path=None,
+                 checkpoint_interval=100,
+                 resume_from=None
                  ):
         self.G = G
         self.ffs_per_step = ffs_per_step
         self.gather_iteration_stats = gather_iteration_stats,
         self.operators = operators
+        # simulate all specimens scored at once together (see batch_simulation)
+        self.batch_evaluation = batch_evaluation
+        # optional fitness_cache.FitnessCache, has to be created for G
+        self.fitness_cache = fitness_cache
+        # resume simulations of mutants from traces of their parents, not supported by batch_evaluation
+        self.incremental_evaluation = incremental_evaluation
+        # number of processes scoring specimens in parallel (see evaluation_pool), 0 - score in the main process
+        # results don't depend on it, batch_evaluation and incremental_evaluation are not supported with workers
+        self.workers = workers
+        # keep node states of single specimen simulations packed in bitsets (see bitset_simulation),
+        # not supported by batch_evaluation
+        self.bitset_states = bitset_states
+        if incremental_evaluation and (batch_evaluation or workers):
+            raise ValueError('incremental_evaluation is not supported by batch_evaluation nor workers')
+        if bitset_states and batch_evaluation:
+            raise ValueError('bitset_states is not supported by batch_evaluation')
+        if batch_evaluation and workers:
+            raise ValueError('batch_evaluation is not supported with workers')
+        # children replace the worst specimens right after they're scored, instead of a succession of whole
+        # generation (see _steady_state_loop)
+        self.steady_state = steady_state
+        # keep population in a population_matrix.PopulationMatrix instead of list((specimen, AlgoScore)),
+        # operators have to be wrapped with operator_adapter, specimens of crossover & mutation are its rows
+        self.population_matrix = population_matrix
+        if steady_state and population_matrix:
+            raise ValueError('population_matrix is not supported by steady_state')
+        if incremental_evaluation and population_matrix:
+            # parents of mutants are copied out of the matrix, so their traces can't be found
+            raise ValueError('incremental_evaluation is not supported by population_matrix')
+        # state of the run is saved to checkpoint_path every checkpoint_interval iterations (see checkpoint module),
+        # path can contain {} placeholder for the iteration number, otherwise the last checkpoint is overwritten
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        # path of a checkpoint to continue from instead of initializing the population,
+        # stop condition and random states are restored from it as well, so the run continues exactly
+        self.resume_from = resume_from
 
         if stop_condition is None:
             self.stop_condition = IterBoundSC(iter_no)
+        else:
+            self.stop_condition = stop_condition
 
 
 class AlgoOut(object):
-    def __init__(self, best_solution, best_solution_score, iteration_results):
+    def __init__(self, best_solution, best_solution_score, iteration_results, iteration_evaluations=None,
+                 islands=None):
         self.best_solution = best_solution
         self.best_solution_score = best_solution_score
         self.iteration_results = iteration_results
+        # number of specimens scored in each iteration
+        self.iteration_evaluations = iteration_evaluations
+        # list of AlgoOut of each island, if the result was merged from an island model run
+        self.islands = islands
 
 
-def _process_solution(params, solution, comment="", offer_vis=False):
-    def _sol_string():
-        return "Solution (comment: {}), score: {}".format(comment, score)
+def _to_algo_score(G, solution_score):
+    return AlgoScore(perc_saved_nodes=float(solution_score.nodes_saved) / G.nodes_number,
+                     perc_saved_occupied_by_ff=float(solution_score.nodes_occupied_by_ff) / G.nodes_number,
+                     pruned=solution_score.pruned)
+
+
+def _to_nodes_threshold(G, threshold):
+    return threshold * G.nodes_number if threshold is not None else None
 
-    G = params.G
 
-    transitions, solution_score = simulation(G, solution, params.ffs_per_step)
-    score = AlgoScore(perc_saved_nodes=float(solution_score.nodes_saved) / len(G.get_nodes()),
-                      perc_saved_occupied_by_ff=float(solution_score.nodes_occupied_by_ff) / len(G.get_nodes()))
+def _sol_string(comment, score):
+    return "Solution (comment: {}), score: {}".format(comment, score)
 
-    if offer_vis and algo_vis_last_logger.isEnabledFor(INFO):
-        print _sol_string()
+
+def _process_solution(params, solution, comment="", offer_vis=False, parent_score=None, threshold=None):
+    G = params.G
+    trace = None
+    nodes_threshold = _to_nodes_threshold(G, threshold)
+
+    cache = params.fitness_cache
+    visualize = offer_vis and algo_vis_last_logger.isEnabledFor(INFO)
+    if visualize:
+        transitions, solution_score = simulation(G, solution, params.ffs_per_step)
+    else:
+        solution_score = cache.get(solution) if cache is not None else None
+        if solution_score is None:
+            if params.incremental_evaluation:
+                parent_trace = parent_score.trace if parent_score is not None else None
+                solution_score, trace = simulation_trace(G, solution, params.ffs_per_step, parent_trace,
+                                                         nodes_threshold)
+            else:
+                score_function = bitset_simulation.simulation_score if params.bitset_states else simulation_score
+                solution_score = score_function(G, solution, params.ffs_per_step, threshold=nodes_threshold)
+            if cache is not None and not solution_score.pruned:
+                cache.put(solution, solution_score)
+    score = _to_algo_score(G, solution_score)
+    score.trace = trace
+
+    if visualize:
+        print _sol_string(comment, score)
         visualize_simulation(G, transitions, solution)
     elif new_solution_logger.isEnabledFor(INFO):
-        new_solution_logger.info(_sol_string())
+        new_solution_logger.info(_sol_string(comment, score))
 
     return score
 
 
+def _process_population(params, solutions, comment="", parent_scores=None, threshold=None, pool=None):
+    """ Scores list of solutions, returns list of AlgoScore in the same order
+
+    :param parent_scores: optional list of AlgoScore of specimens, that solutions were derived from
+    :param threshold: optional fitness, evaluations are aborted once they can't reach it
+    :param pool: optional EvaluationPool, that scores the solutions
+    """
+    if pool is None and not params.batch_evaluation:
+        if parent_scores is None:
+            parent_scores = [None] * len(solutions)
+        return [_process_solution(params, solution, comment, parent_score=parent_score, threshold=threshold)
+                for solution, parent_score in zip(solutions, parent_scores)]
+
+    cache = params.fitness_cache
+    solution_scores = [cache.get(solution) if cache is not None else None for solution in solutions]
+    missing = [index for index, solution_score in enumerate(solution_scores) if solution_score is None]
+    evaluate = pool.simulation_scores if pool is not None else partial(simulation_scores, params.G)
+    simulated = evaluate([solutions[index] for index in missing], params.ffs_per_step,
+                         _to_nodes_threshold(params.G, threshold))
+    for index, solution_score in zip(missing, simulated):
+        solution_scores[index] = solution_score
+        if cache is not None and not solution_score.pruned:
+            cache.put(solutions[index], solution_score)
+
+    scores = [_to_algo_score(params.G, solution_score) for solution_score in solution_scores]
+    if new_solution_logger.isEnabledFor(INFO):
+        for score in scores:
+            new_solution_logger.info(_sol_string(comment, score))
+    return scores
+
+
 class ExecutionState(object):
     '''
     Specimen - permutation of node ids
@@ -197,13 +458,23 @@ class ExecutionState(object):
         children: list(specimen)
         scored_children: list((specimen, AlgoScore))
         mutation_candidates: list(specimen)
+        mutated_specimens: list(specimen)
         scored_mutated_specimens: list((specimen, AlgoScore))
+        evaluations: number of specimens scored in current iteration
+        total_evaluations: number of specimens scored since the start (including initial population)
+        best: (specimen, AlgoScore) best in the population, for loops that keep track of it (steady state),
+            None otherwise
+        steady_population: steady_state.SteadyStatePopulation of the steady-state loop, None otherwise
     '''
 
     def __init__(self, params):
         self.params = params
 
+        self.evaluation_pool = None
         self.population = []
+        self.total_evaluations = 0
+        self.best = None
+        self.steady_population = None
         self.reset_per_iteration_state()
 
     def reset_per_iteration_state(self):
@@ -212,70 +483,239 @@ class ExecutionState(object):
         self.children = []
         self.scored_children = []
         self.mutation_candidates = []
+        self.mutated_specimens = []
         self.scored_mutated_specimens = []
+        self.evaluations = 0
+
+
+def _evaluate_offspring(params, es, threshold):
+    """ Evaluation stage, scores all children from crossover and mutation, each distinct specimen only once """
+    offspring = es.children + es.mutated_specimens
+
+    parent_scores = None
+    if params.incremental_evaluation:
+        scores_by_specimen = dict((id(specimen), score) for specimen, score in es.population)
+        parent_scores = [None] * len(es.children) + [scores_by_specimen.get(id(candidate))
+                                                     for candidate in es.mutation_candidates]
+
+    unique_positions = dict()
+    unique_specimens = list()
+    unique_parent_scores = list()
+    positions = list()
+    for index, specimen in enumerate(offspring):
+        key = _specimen_key(specimen)
+        if key not in unique_positions:
+            unique_positions[key] = len(unique_specimens)
+            unique_specimens.append(specimen)
+            unique_parent_scores.append(parent_scores[index] if parent_scores is not None else None)
+        positions.append(unique_positions[key])
+
+    scores = _process_population(params, unique_specimens, "offspring", unique_parent_scores, threshold,
+                                 pool=es.evaluation_pool)
+    es.evaluations += len(unique_specimens)
+    es.total_evaluations += len(unique_specimens)
+
+    offspring_scores = [scores[position] for position in positions]
+    es.scored_children = zip(es.children, offspring_scores[:len(es.children)])
+    es.scored_mutated_specimens = zip(es.mutated_specimens, offspring_scores[len(es.children):])
 
 
 def ga_framework(params):
-    algo_per_iter_stats_logger.info(per_iter_stats_format.format("ITER_NO", "MAX_SAVED", "MAX_SAVED_FF", "SCORES_SUM"))
+    algo_per_iter_stats_logger.info(per_iter_stats_format.format("ITER_NO", "MAX_SAVED", "MAX_SAVED_FF", "SCORES_SUM",
+                                                                 "EVALS"))
 
     es = ExecutionState(params)
+    if params.workers:
+        score_function = bitset_simulation.simulation_score if params.bitset_states else simulation_score
+        es.evaluation_pool = EvaluationPool(params.G, params.workers, score_function)
+    try:
+        loop = _steady_state_loop if params.steady_state else _ga_loop
+        return loop(params, es)
+    finally:
+        if es.evaluation_pool is not None:
+            es.evaluation_pool.close()
+
+
+def _initialize_population(params, es):
+    initial_population = params.operators.population_initialization(es)
+    scores = _process_population(params, initial_population, "initial population", pool=es.evaluation_pool)
+    es.total_evaluations += len(initial_population)
+    es.population.extend(zip(initial_population, scores))
+
+
+def _save_checkpoint(params, es, i, iteration_results, iteration_evaluations):
+    scores = [score for _, score in es.population]
+    state = {
+        'iteration': i,
+        'total_evaluations': es.total_evaluations,
+        'iteration_results': iteration_results,
+        'iteration_evaluations': iteration_evaluations,
+        'stop_condition': params.stop_condition,
+        'random_state': random.getstate(),
+        'numpy_random_state': np.random.get_state(),
+    }
+    if es.steady_population is not None:
+        # order of equally fit specimens in the heap decides which one is replaced next
+        state['steady_state_heap'] = es.steady_population.heap_state()
+    save_checkpoint(params.checkpoint_path.format(i),
+                    [specimen for specimen, _ in es.population],
+                    {
+                        'perc_saved_nodes': np.array([score.perc_saved_nodes for score in scores]),
+                        'perc_saved_occupied_by_ff': np.array([score.perc_saved_occupied_by_ff for score in scores]),
+                        'pruned': np.array([score.pruned for score in scores], dtype=np.bool_),
+                    },
+                    state)
+
+
+def _start(params, es):
+    """ Initializes population, or restores it from params.resume_from
+
+    :return: (number of the first iteration to run, iteration_results, iteration_evaluations)
+    """
+    if params.resume_from is None:
+        _initialize_population(params, es)
+        return 0, dict(), dict()
+
+    specimens, score_columns, state = load_checkpoint(params.resume_from)
+    scores = [AlgoScore(perc_saved_nodes, perc_saved_occupied_by_ff, pruned=pruned)
+              for perc_saved_nodes, perc_saved_occupied_by_ff, pruned
+              in zip(score_columns['perc_saved_nodes'].tolist(), score_columns['perc_saved_occupied_by_ff'].tolist(),
+                     score_columns['pruned'].tolist())]
+    es.population = zip(specimens.tolist(), scores)
+    if 'steady_state_heap' in state:
+        es.steady_population = SteadyStatePopulation(es.population, state['steady_state_heap'])
+    es.total_evaluations = state['total_evaluations']
+    params.stop_condition = state['stop_condition']
+    random.setstate(state['random_state'])
+    np.random.set_state(state['numpy_random_state'])
+    return state['iteration'] + 1, state['iteration_results'], state['iteration_evaluations']
+
+
+def _after_iteration(params, es, i, iteration_results, iteration_evaluations):
+    if params.checkpoint_path is not None and (i + 1) % params.checkpoint_interval == 0:
+        _save_checkpoint(params, es, i, iteration_results, iteration_evaluations)
+    es.reset_per_iteration_state()
+
+
+def _breed(params, es):
+    # crossover
+    es.parents_list = params.operators.crossover_selection(es)
+    for parents in es.parents_list:
+        children = params.operators.crossover(es, parents)
+        es.children.extend(children)
+
+    # mutation
+    es.mutation_candidates = params.operators.mutation_selection(es)
+    mutated_specimens = params.operators.batch_mutation(es, es.mutation_candidates)
+    if mutated_specimens is not None:
+        es.mutated_specimens.extend(mutated_specimens)
+        return
+    for candidate in es.mutation_candidates:
+        specimen_to_mutate = _copy_specimen(candidate)
+        es.mutated_specimens.append(params.operators.mutation(es, specimen_to_mutate))
+
+
+def _log_iteration_stats(i, es, best_score, sum_scores):
+    algo_per_iter_stats_logger.info(per_iter_stats_format.format(i, best_score.perc_saved_nodes,
+                                                                 best_score.perc_saved_occupied_by_ff, sum_scores,
+                                                                 es.evaluations))
+
+
+def _finish(params, best_solution, score, iteration_results, iteration_evaluations):
+    if params.fitness_cache is not None:
+        fitness_cache_logger.info("Fitness cache: {}".format(params.fitness_cache))
+
+    # solely to give chance to visualize
+    _process_solution(params, best_solution, comment="Best solution", offer_vis=True)
+    return AlgoOut(best_solution, score, iteration_results, iteration_evaluations)
+
 
-    for specimen in params.operators.population_initialization(es):
-        score = _process_solution(params, specimen, "initial population")
-        es.population.append((specimen, score))
+def _ga_loop(params, es):
+    i, iteration_results, iteration_evaluations = _start(params, es)
+    if params.population_matrix:
+        es.population = PopulationMatrix.from_population(es.population)
     if SORT_POPULATION:
         es.population = sort_by_score(es.population)
 
-    i = 0
-    iteration_results = dict()
     while params.stop_condition.should_continue(i, es):
         es.current_iteration = i
+        threshold = params.operators.survival_threshold(es)
+
+        _breed(params, es)
 
-        # crossover
-        es.parents_list = params.operators.crossover_selection(es)
-        for parents in es.parents_list:
-            children = params.operators.crossover(es, parents)
-            es.children.extend(children)
-            for child in es.children:
-                score = _process_solution(params, child, "crossover result")
-                es.scored_children.append((child, score))
-
-        # mutation
-        es.mutation_candidates = params.operators.mutation_selection(es)
-        for candidate in es.mutation_candidates:
-            specimen_to_mutate = list(candidate)
-            mutated_specimen = params.operators.mutation(es, specimen_to_mutate)
-            score = _process_solution(params, mutated_specimen, "mutation result")
-            es.scored_mutated_specimens.append((mutated_specimen, score))
+        # evaluation
+        _evaluate_offspring(params, es, threshold)
+        iteration_evaluations[i] = es.evaluations
 
         # add results of crossover & mutation to population
-        es.population.extend(es.scored_children)
-        es.population.extend(es.scored_mutated_specimens)
+        es.population.extend(es.scored_children + es.scored_mutated_specimens)
 
         # sucession
         if SORT_POPULATION:
             es.population = sort_by_score(es.population)
         es.population = params.operators.succession(es)
+        es.population = params.operators.migration(es)
         if SORT_POPULATION:
             es.population = sort_by_score(es.population)
 
-        if i % SHOW_SCORE_EVERY == 0:
+        if i % SHOW_SCORE_EVERY == 0 and algo_populations_logger.isEnabledFor(INFO):
             algo_populations_logger.info("Population after iteration {}: {}"
-                                         .format(i, map(lambda (_, score): str(score), es.population)))
+                                         .format(i, population_scores(es.population)))
 
         if algo_per_iter_stats_logger.isEnabledFor(INFO) or params.gather_iteration_stats:
             _, max_score = es.population[0]
-            max_saved = max_score.perc_saved_nodes
-            max_saved_ff = max_score.perc_saved_occupied_by_ff
-            sum_scores = sum(map(lambda (_, score): score.perc_saved_nodes, es.population))
-            algo_per_iter_stats_logger.info(per_iter_stats_format.format(i, max_saved, max_saved_ff, sum_scores))
-            iteration_results[i] = max_saved
+            _log_iteration_stats(i, es, max_score, _fitness_sum(es.population))
+            iteration_results[i] = max_score.perc_saved_nodes
 
-        es.reset_per_iteration_state()
+        _after_iteration(params, es, i, iteration_results, iteration_evaluations)
         i += 1
 
     best_solution, score = find_n_best_solutions(es.population, 1)[0]
+    return _finish(params, best_solution, score, iteration_results, iteration_evaluations)
 
-    # solely to give chance to visualize
-    _process_solution(params, best_solution, comment="Best solution", offer_vis=True)
-    return AlgoOut(best_solution, score, iteration_results)
+
+def _steady_state_loop(params, es):
+    """ Steady-state variant of _ga_loop. Each iteration breeds the few children given by operators
+        (crossover_selection, crossover, mutation_selection, mutation), scores them and each of them replaces
+        the worst specimen of the population, if it's better (see steady_state.SteadyStatePopulation).
+        Population size is the size of the initial population and never changes.
+
+        Operators.succession and Operators.migration are not used, survival threshold is always the fitness
+        of the worst specimen. es.population is a list of population slots, it's never sorted.
+    """
+    i, iteration_results, iteration_evaluations = _start(params, es)
+    if es.steady_population is None:
+        es.steady_population = SteadyStatePopulation(es.population)
+    population = es.steady_population
+    es.population = population.slots
+    es.best = population.best
+
+    while params.stop_condition.should_continue(i, es):
+        es.current_iteration = i
+
+        _breed(params, es)
+
+        # evaluation, children worse than the worst specimen are rejected anyway
+        _evaluate_offspring(params, es, population.worst_fitness)
+        iteration_evaluations[i] = es.evaluations
+
+        # replacement
+        for specimen, score in es.scored_children + es.scored_mutated_specimens:
+            if not score.pruned:
+                population.insert(specimen, score)
+        es.best = population.best
+
+        if i % SHOW_SCORE_EVERY == 0 and algo_populations_logger.isEnabledFor(INFO):
+            algo_populations_logger.info("Population after iteration {}: {}"
+                                         .format(i, population_scores(es.population)))
+
+        if algo_per_iter_stats_logger.isEnabledFor(INFO) or params.gather_iteration_stats:
+            _, max_score = population.best
+            _log_iteration_stats(i, es, max_score, population.fitness_sum)
+            iteration_results[i] = max_score.perc_saved_nodes
+
+        _after_iteration(params, es, i, iteration_results, iteration_evaluations)
+        i += 1
+
+    best_solution, score = population.best
+    return _finish(params, best_solution, score, iteration_results, iteration_evaluations)
@@ -3,24 +3,125 @@
 import argparse
 import os
 import random
-from collections import Counter
-from itertools import combinations
 
-from graph import Graph
+import numpy as np
+
+from graph import edges_to_binary, text_to_binary
+from graph_cache import GraphCache
+from graph_families import grid_edges, random_geometric_edges, scale_free_edges, small_world_edges
+
+# edges formatted at once while writing a graph file
+WRITE_CHUNK = 10 ** 5
+
+
+def _pair_offsets(vertices_num, v1):
+    """ Index of pair (v1, v1 + 1) in the order of combinations(xrange(vertices_num), 2) """
+    return v1 * (2 * vertices_num - v1 - 1) // 2
+
+
+def _pairs(vertices_num, pair_indexes):
+    """ Inverse of the indexing of combinations(xrange(vertices_num), 2): (v1, v2) arrays of given pairs """
+    pair_indexes = np.asarray(pair_indexes, dtype=np.int64)
+    b = 2 * vertices_num - 1
+    v1 = ((b - np.sqrt(np.maximum(b * b - 8.0 * pair_indexes, 0))) // 2).astype(np.int64)
+    # fix floating point rounding
+    v1 -= _pair_offsets(vertices_num, v1) > pair_indexes
+    v1 += _pair_offsets(vertices_num, v1 + 1) <= pair_indexes
+    v2 = pair_indexes - _pair_offsets(vertices_num, v1) + v1 + 1
+    return v1, v2
 
 
 def generate_edges(vertices_num, density):
-    """
+    """ Samples edges uniformly, without listing all possible ones: O(edges) time and memory.
+        For a given random state, it draws exactly the edges random.sample(list(combinations(...))) would.
+
     :param vertices_num: number of graph vertices to be generated
     :param density: float in [0..1] where 0 - no edges at all, 1 - clique
+    :return: (edges number, int64 array of shape (edges number, 2))
     """
     max_edges = (vertices_num * (vertices_num - 1)) / 2
     edges_num = int(max_edges * density)
 
-    all_possible_edges = combinations(xrange(vertices_num), 2)
+    v1, v2 = _pairs(vertices_num, random.sample(xrange(max_edges), edges_num))
+    return edges_num, np.column_stack((v1, v2))
+
+
+def _find(parents, node):
+    while parents[node] != node:
+        parents[node] = parents[parents[node]]
+        node = parents[node]
+    return node
+
 
-    edges = random.sample(list(all_possible_edges), edges_num)
-    return edges_num, edges
+def connect(vertices_num, edges):
+    """ Makes the graph connected, keeping the number of edges: each connected component is linked to the rest
+        of the graph with an edge to a random node, in place of a random redundant edge (one closing a cycle,
+        it can be removed without disconnecting anything). Components are found with union-find.
+
+    :param edges: int64 array of shape (edges number, 2), at least vertices_num - 1 edges
+    :return: array of edges of the connected graph
+    """
+    parents = range(vertices_num)
+    redundant = list()
+    for index, (v_start, v_end) in enumerate(edges.tolist()):
+        root_start, root_end = _find(parents, v_start), _find(parents, v_end)
+        if root_start == root_end:
+            redundant.append(index)
+        else:
+            parents[root_start] = root_end
+
+    roots = [node for node in xrange(vertices_num) if _find(parents, node) == node]
+    if len(roots) == 1:
+        return edges
+    if len(redundant) < len(roots) - 1:
+        raise ValueError("Too few edges to make the graph connected")
+
+    # nodes of each component, to pick the linked ones at random
+    components = dict((root, list()) for root in roots)
+    for node in xrange(vertices_num):
+        components[_find(parents, node)].append(node)
+
+    edges = edges.copy()
+    connected_nodes = list(components[roots[0]])
+    for root in roots[1:]:
+        component = components[root]
+        removed = redundant.pop(random.randrange(len(redundant)))
+        edges[removed] = (random.choice(component), random.choice(connected_nodes))
+        connected_nodes.extend(component)
+    return edges
+
+
+def write_graph(out_file, vertices_num, edges, starting_vertices):
+    """ Writes graph in the text format (see Graph.from_file), formatting edges in bulk """
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    with open(out_file, 'w') as f:
+        f.write("{} {}\n".format(vertices_num, len(edges)))
+        for sv in starting_vertices:
+            f.write("{} ".format(sv))
+        f.write('\n')
+        for start in xrange(0, len(edges), WRITE_CHUNK):
+            f.write("".join("{} {}\n".format(v_start, v_end)
+                            for v_start, v_end in edges[start:start + WRITE_CHUNK].tolist()))
+
+
+def write_edge_chunks(out_file, vertices_num, edge_chunks, starting_vertices):
+    """ Writes graph in the text format, streaming edges from chunks of (v1, v2) arrays. The number of edges is
+        not known upfront, so it is written in a padded header field once all edges are out.
+    """
+    with open(out_file, 'w') as f:
+        f.write("{} ".format(vertices_num))
+        edges_num_position = f.tell()
+        f.write("{:<20}\n".format(0))
+        f.write("".join("{} ".format(sv) for sv in starting_vertices))
+        f.write('\n')
+        edges_num = 0
+        for v1, v2 in edge_chunks:
+            for start in xrange(0, len(v1), WRITE_CHUNK):
+                f.write("".join("{} {}\n".format(v_start, v_end) for v_start, v_end
+                                in zip(v1[start:start + WRITE_CHUNK].tolist(), v2[start:start + WRITE_CHUNK].tolist())))
+            edges_num += len(v1)
+        f.seek(edges_num_position)
+        f.write("{:<20}".format(edges_num))
 
 
 def generate_tree_edges(child_probability=0.7, max_nodes=150):
@@ -44,52 +145,92 @@ def generate_tree_edges(child_probability=0.7, max_nodes=150):
     return tree_size, current_node + 1, edges
 
 
-def generate_file_data(out_file, vertices_num, density, starting_vertices_num, tree=False):
+def generate_graph(vertices_num, density, starting_vertices_num, tree=False):
+    """ :return: (vertices number, int64 array of edges of shape (edges number, 2), starting vertices) """
     if tree:
         # in case of tree vertices_num is maximum number of vertices
         edges_num, vertices_num, edges = generate_tree_edges(child_probability=density, max_nodes=vertices_num)
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
     else:
 
         if density < 2 * (float(vertices_num - 1) / (vertices_num * (vertices_num - 1))):
             raise ValueError("Density too low, cannot generate connected graph")
 
         edges_num, edges = generate_edges(vertices_num, density)
+        edges = connect(vertices_num, edges)
 
-        # make graph connected by connecting unconnected nodes to graph
-        # and removing edges that will not make graph unconnected again
-        # each time we remove an edge we have to check the conditions again
-        while True:
-            nodes_degree = Counter()
-            for v_start, v_end in edges:
-                nodes_degree[v_start] += 1
-                nodes_degree[v_end] += 1
+    starting_vertices = random.sample(xrange(vertices_num), starting_vertices_num)
+    return vertices_num, edges, starting_vertices
 
-            unconnected_nodes = set([node for node in xrange(vertices_num) if node not in nodes_degree])
 
-            if not unconnected_nodes:
-                break
+def generate_file_data(out_file, vertices_num, density, starting_vertices_num, tree=False, binary=False):
+    vertices_num, edges, starting_vertices = generate_graph(vertices_num, density, starting_vertices_num, tree)
 
-            # add an edge from unconnected node to a random node
-            edges.append((unconnected_nodes.pop(), random.randint(0, vertices_num - 1)))
+    if binary:
+        edges_to_binary(vertices_num, lambda: [(edges[:, 0], edges[:, 1])], starting_vertices, out_file)
+    else:
+        write_graph(out_file, vertices_num, edges, starting_vertices)
 
-            # find each edge which removal will not make graph unconnected
-            redundant_edges = set()
-            for v_start, v_end in edges:
-                if nodes_degree[v_start] >= 2 and nodes_degree[v_end] >= 2:
-                    redundant_edges.add((v_start, v_end))
 
-            # remove one redundant edge
-            edges.remove(redundant_edges.pop())
+def generate_seeded_file_data(seed, *args, **kwargs):
+    """ generate_file_data with the random module seeded with seed (unless it's None), its state is restored after """
+    if seed is None:
+        return generate_file_data(*args, **kwargs)
+    random_state = random.getstate()
+    random.seed(seed)
+    try:
+        return generate_file_data(*args, **kwargs)
+    finally:
+        random.setstate(random_state)
 
-    starting_vertices = random.sample(xrange(vertices_num), starting_vertices_num)
 
-    with open(out_file, 'w') as f:
-        f.write("{} {}\n".format(vertices_num, edges_num))
-        for sv in starting_vertices:
-            f.write("{} ".format(sv))
-        f.write('\n')
-        for e in edges:
-            f.write("{} {}\n".format(*e))
+def resolve_seed(seed):
+    """ Concrete seed in place of None, so a generator can be replayed; drawn from the random module """
+    return random.getrandbits(32) if seed is None else seed
+
+
+def family_edges(topology, vertices_num, seed=None, attachments=3, width=None, radius=None, neighbours=4,
+                 rewiring_probability=0.1):
+    """ :return: (vertices number, function returning a fresh iterator of edge chunks) for one of TOPOLOGIES;
+        every call of the function yields the same edges, also for seed None (a random seed is picked once);
+        grid has vertices_num // width rows of width nodes (square by default)
+    """
+    seed = resolve_seed(seed)
+    if topology == 'scale_free':
+        return vertices_num, lambda: scale_free_edges(vertices_num, attachments, seed)
+    elif topology == 'grid':
+        columns = width or max(1, int(np.sqrt(vertices_num)))
+        rows = vertices_num // columns
+        return rows * columns, lambda: grid_edges(rows, columns)
+    elif topology == 'geometric':
+        # twice the connectivity threshold by default
+        radius = radius or 2 * np.sqrt(np.log(max(vertices_num, 2)) / (np.pi * vertices_num))
+        return vertices_num, lambda: random_geometric_edges(vertices_num, radius, seed)
+    elif topology == 'small_world':
+        return vertices_num, lambda: small_world_edges(vertices_num, neighbours, rewiring_probability, seed)
+    raise ValueError("Unknown topology {}".format(topology))
+
+
+TOPOLOGIES = ['random', 'scale_free', 'grid', 'geometric', 'small_world']
+
+
+def generate_family_file(out_file, topology, vertices_num, starting_vertices_num, binary=False, seed=None,
+                         **params):
+    """ Streams a graph of one of the topologies (see family_edges) straight to the output file,
+        in the text or the binary format; edges are never held in memory all at once.
+    """
+    seed = resolve_seed(seed)
+    vertices_num, edge_chunks = family_edges(topology, vertices_num, seed, **params)
+    starting_vertices = random.Random(seed).sample(xrange(vertices_num), starting_vertices_num)
+    if binary:
+        edges_to_binary(vertices_num, edge_chunks, starting_vertices, out_file)
+    else:
+        write_edge_chunks(out_file, vertices_num, edge_chunks(), starting_vertices)
+
+
+def convert_to_binary(input_file, output_file):
+    """ Converts graph from the text format to the binary one (see Graph.save_binary), streaming the edge list """
+    text_to_binary(input_file, output_file)
 
 
 def _get_script_dir():
@@ -100,17 +241,39 @@ def _generate_graph_file_name(vertex_no, density, starting_vertices_no):
     return u"{}_{}_{}.rgraph".format(vertex_no, density, starting_vertices_no)
 
 
-def load_graph(vertex_no, density, starting_vertices_no=1):
-    graphs_dir = "graphs/"
-    fname = _generate_graph_file_name(vertex_no, density, starting_vertices_no)
-    graph_file_path = os.path.join(_get_script_dir(), graphs_dir, fname)
+GRAPH_CACHE = GraphCache(os.path.join(_get_script_dir(), "graphs", "cache"))
+
 
-    if not os.path.isfile(graph_file_path):
-        generate_file_data(graph_file_path, vertex_no, density, starting_vertices_no)
+def load_graph(vertex_no, density, starting_vertices_no=1, seed=None):
+    """ Random graph of given parameters, generated on the first use and then taken from GRAPH_CACHE,
+        so repeated calls return the same graph (the very same instance while it's in the in-process registry).
+        An unseeded graph couldn't be generated again once its cached file is evicted, so it's also kept
+        in graphs/V_D_S.rgraph, as before the cache was there, and the cached file is converted from it.
+    """
+    legacy_file = os.path.join(_get_script_dir(), "graphs", _generate_graph_file_name(vertex_no, density,
+                                                                                      starting_vertices_no))
+
+    def write_binary(path):
+        if seed is None:
+            if not os.path.isfile(legacy_file):
+                generate_file_data(legacy_file, vertex_no, density, starting_vertices_no)
+            text_to_binary(legacy_file, path)
+        else:
+            generate_seeded_file_data(seed, path, vertex_no, density, starting_vertices_no, binary=True)
 
-    graph = Graph.from_file(graph_file_path)
+    return GRAPH_CACHE.get(('random', vertex_no, density, starting_vertices_no, seed), write_binary)
 
-    return graph
+
+def load_family_graph(topology, vertices_num, starting_vertices_num=1, seed=None, **params):
+    """ Graph of one of TOPOLOGIES streamed by generate_family_file, cached like in load_graph.
+        The seed is required, an unseeded graph couldn't be reproduced, so there would be nothing to memoize.
+    """
+    if seed is None:
+        raise ValueError("Cached graphs of streamed topologies need a seed")
+    key = (topology, vertices_num, starting_vertices_num, seed) + tuple("{}={!r}".format(name, value)
+                                                                         for name, value in sorted(params.iteritems()))
+    return GRAPH_CACHE.get(key, lambda path: generate_family_file(path, topology, vertices_num, starting_vertices_num,
+                                                                  binary=True, seed=seed, **params))
 
 
 if __name__ == '__main__':
@@ -119,9 +282,40 @@ if __name__ == '__main__':
     parser.add_argument('-d', '--density', help='edges density; float in range [0..1]', type=float, default=0.2)
     parser.add_argument('-s', '--starting_vertices', help='number of starting vertices', type=int, default=1)
     parser.add_argument('--out', help='output file', default=os.path.join('graphs', 'random.txt'))
+    parser.add_argument('-t', '--topology', help='kind of graph, all but random are streamed to the output file',
+                        choices=TOPOLOGIES, default='random')
+    parser.add_argument('-b', '--binary', help='write the graph in the binary format',
+                        action='store_true')
+    parser.add_argument('--seed', help='random seed of the generated graph', type=int)
+    parser.add_argument('-m', '--attachments', help='scale_free: edges of each new node', type=int, default=3)
+    parser.add_argument('-w', '--width', help='grid: nodes in a row, square grid by default', type=int)
+    parser.add_argument('-r', '--radius', help='geometric: link distance in the unit square, '
+                                               'twice the connectivity threshold by default', type=float)
+    parser.add_argument('-k', '--neighbours', help='small_world: ring lattice degree, even', type=int, default=4)
+    parser.add_argument('-p', '--rewiring', help='small_world: probability of rewiring an edge', type=float,
+                        default=0.1)
+    parser.add_argument('-c', '--convert',
+                        help='instead of generating a graph, convert given text graph file to the binary format')
     args = parser.parse_args()
 
-    generate_file_data(out_file=args.out,
-                       vertices_num=args.vertices,
-                       density=args.density,
-                       starting_vertices_num=args.starting_vertices)
+    if args.convert:
+        convert_to_binary(args.convert, args.out)
+    elif args.topology != 'random':
+        generate_family_file(out_file=args.out,
+                             topology=args.topology,
+                             vertices_num=args.vertices,
+                             starting_vertices_num=args.starting_vertices,
+                             binary=args.binary,
+                             seed=args.seed,
+                             attachments=args.attachments,
+                             width=args.width,
+                             radius=args.radius,
+                             neighbours=args.neighbours,
+                             rewiring_probability=args.rewiring)
+    else:
+        generate_seeded_file_data(args.seed,
+                                  out_file=args.out,
+                                  vertices_num=args.vertices,
+                                  density=args.density,
+                                  starting_vertices_num=args.starting_vertices,
+                                  binary=args.binary)
@@ -1,27 +1,104 @@
+import os
 from logging import getLogger
 
+import numpy as np
 from enum import Enum
 
 NodeState = Enum('NodeState', 'UNTOUCHED DEFENDED BURNING')
 
+# raw values kept in the per-node state byte array
+UNTOUCHED = NodeState.UNTOUCHED.value
+DEFENDED = NodeState.DEFENDED.value
+BURNING = NodeState.BURNING.value
+
 logger = getLogger("graph_printing")
 
+# binary graph format: header of BINARY_HEADER_SIZE bytes - BINARY_MAGIC followed by little endian int64 fields
+# (format version, nodes number, length of indices, number of initial fire nodes), then little endian int32 arrays
+# indptr, indices and initial fire nodes ids, one after another
+BINARY_MAGIC = b'FFGRAPH\0'
+BINARY_VERSION = 1
+BINARY_HEADER_SIZE = len(BINARY_MAGIC) + 4 * 8
+_BINARY_HEADER_TYPE = np.dtype('<i8')
+_BINARY_ARRAY_TYPE = np.dtype('<i4')
+
+# bytes of text edge list parsed at once by the bulk loader, bounds its memory use apart from the CSR arrays
+TEXT_CHUNK_SIZE = 1 << 24
+
 
 class Graph(object):
+    """ Undirected graph kept in compressed sparse row (CSR) form:
+        neighbors of node i are indices[indptr[i]:indptr[i + 1]]
+        state[i] holds the raw NodeState value of node i, it's what Node views show
+
+        The adjacency arrays are read-only, simulations keep their per-run states in buffers from new_state(),
+        so any number of them can share one graph.
+        Node objects are created lazily and only act as views on these arrays.
+    """
+
     def __init__(self):
         self.nodes_number = 0
-        self.nodes = dict()
-        self.init_nodes = list()
-        self.burning_nodes = list()
+        self.indptr = np.zeros(1, dtype=np.int32)
+        self.indices = np.zeros(0, dtype=np.int32)
+        self.state = np.zeros(0, dtype=np.uint8)
+        self.init_nodes_ids = np.zeros(0, dtype=np.int32)
+        # path of the binary file the adjacency is memory-mapped from, if any
+        self.binary_path = None
+        self._nodes = None
+        # edges cache, see edges()
+        self._edges = None
+        self._edge_list = None
         super(Graph, self).__init__()
 
+    def __getstate__(self):
+        # node views are recreated on demand
+        state = self.__dict__.copy()
+        state['_nodes'] = None
+        state['_edges'] = None
+        state['_edge_list'] = None
+        if self.binary_path is not None:
+            # other processes map the same file instead of receiving a copy of the adjacency
+            del state['indptr'], state['indices']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.binary_path is not None:
+            self.indptr, self.indices, _ = _map_binary(self.binary_path)
+
+    @property
+    def nodes(self):
+        if self._nodes is None:
+            self._nodes = dict((node_id, Node(self, node_id)) for node_id in xrange(self.nodes_number))
+        return self._nodes
+
+    @property
+    def init_nodes(self):
+        return [self.nodes[node_id] for node_id in self.init_nodes_ids.tolist()]
+
+    @property
+    def burning_nodes(self):
+        return [self.nodes[node_id] for node_id in np.flatnonzero(self.state == BURNING).tolist()]
+
+    def edges(self):
+        """ Each undirected edge once, as (v1, v2) with v1 <= v2, sorted by v1 then v2
+
+        :return: two read-only int32 arrays (v1, v2), cached until the edges change
+        """
+        if self._edges is None:
+            sources = np.repeat(np.arange(self.nodes_number, dtype=np.int32), np.diff(self.indptr))
+            forward = sources <= self.indices
+            self._edges = (sources[forward], np.array(self.indices[forward]))
+            for array in self._edges:
+                array.flags.writeable = False
+        return self._edges
+
     def get_edges(self):
-        edges = list()
-        for node_id in self.nodes:
-            for neighbor in self.nodes[node_id].get_neighbors():
-                if (neighbor.id, node_id) not in edges:
-                    edges.append((node_id, neighbor.id))
-        return edges
+        """ Same as edges(), as a list of (v1, v2) tuples; the list is cached and shared, don't modify it """
+        if self._edge_list is None:
+            v1, v2 = self.edges()
+            self._edge_list = zip(v1.tolist(), v2.tolist())
+        return self._edge_list
 
     def get_burning_nodes(self):
         return self.burning_nodes
@@ -32,6 +109,54 @@ class Graph(object):
     def get_init_nodes(self):
         return self.init_nodes
 
+    def new_state(self):
+        """ Fresh per-node state buffer with every node untouched """
+        return np.full(self.nodes_number, UNTOUCHED, dtype=np.uint8)
+
+    def neighbors(self, node_id):
+        return self.indices[self.indptr[node_id]:self.indptr[node_id + 1]]
+
+    def neighbors_of(self, node_ids):
+        """ Concatenated neighbor lists of all given nodes (may contain duplicates) """
+        starts = self.indptr[node_ids]
+        lengths = self.indptr[node_ids + 1] - starts
+        total = lengths.sum()
+        if not total:
+            return self.indices[:0]
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return self.indices[offsets + np.arange(total)]
+
+    @classmethod
+    def from_edges(cls, nodes_number, v1, v2, starting_nodes_ids):
+        """ Build graph from two parallel sequences of edge endpoints """
+        new_instance = cls()
+        new_instance.nodes_number = nodes_number
+        new_instance._set_adjacency(np.asarray(v1, dtype=np.int64), np.asarray(v2, dtype=np.int64))
+        new_instance.state = new_instance.new_state()
+        new_instance.init_nodes_ids = np.asarray(starting_nodes_ids, dtype=np.int32)
+        return new_instance
+
+    @classmethod
+    def from_binary(cls, input_file):
+        """ Graph with adjacency memory-mapped (read-only, without copying) from a file written by save_binary """
+        new_instance = cls()
+        new_instance.indptr, new_instance.indices, init_nodes_ids = _map_binary(input_file)
+        new_instance.nodes_number = len(new_instance.indptr) - 1
+        new_instance.init_nodes_ids = np.array(init_nodes_ids, dtype=np.int32)
+        new_instance.state = new_instance.new_state()
+        new_instance.binary_path = os.path.abspath(input_file)
+        return new_instance
+
+    def save_binary(self, output_file):
+        """ Writes the graph in the binary format (see BINARY_MAGIC) """
+        header = np.array([BINARY_VERSION, self.nodes_number, len(self.indices), len(self.init_nodes_ids)],
+                          dtype=_BINARY_HEADER_TYPE)
+        with open(output_file, 'wb') as f:
+            f.write(BINARY_MAGIC)
+            f.write(header.tostring())
+            for array in (self.indptr, self.indices, self.init_nodes_ids):
+                f.write(np.asarray(array, dtype=_BINARY_ARRAY_TYPE).tostring())
+
     @classmethod
     def from_file(cls, input_file):
         """ Generate graph from file format:
@@ -47,19 +172,54 @@ class Graph(object):
         second line lists starting vertices
         the following lines determine edges
         this is exactly the format generated by the generate utility
+
+        files in the binary format (see save_binary) are recognized and loaded with from_binary
         """
 
+        if is_binary_file(input_file):
+            return cls.from_binary(input_file)
+
+        with open(input_file, 'rb') as f:
+            nodes_number, starting_nodes_ids = _read_text_header(f)
+
         new_instance = cls()
+        new_instance.nodes_number = nodes_number
+        indptr, indices = _build_csr(nodes_number, lambda: _read_edge_chunks(input_file),
+                                     lambda length: np.empty(length, dtype=np.int32))
+        # copy frees the part of the buffer left over after merging duplicate edges
+        new_instance.indptr, new_instance.indices = indptr, indices.copy()
+        new_instance.indptr.flags.writeable = False
+        new_instance.indices.flags.writeable = False
+        new_instance.state = new_instance.new_state()
+        new_instance.init_nodes_ids = np.asarray(starting_nodes_ids, dtype=np.int32)
+        return new_instance
+
+    @classmethod
+    def from_file_by_lines(cls, input_file):
+        """ Same as from_file for the text format, parses the file line by line. Slow, kept as a reference. """
+
         with open(input_file, 'r') as f:
-            new_instance.nodes_number, _ = map(int, f.readline().split())
-            starting_nodes_ids = [int(s) for s in f.readline().split()]
-            for node_id in xrange(new_instance.nodes_number):
-                new_instance.nodes[node_id] = Node(node_id)
+            nodes_number, starting_nodes_ids = _read_text_header(f)
+            v1, v2 = list(), list()
             for line in f:
-                v1, v2 = map(int, line.split())
-                new_instance.nodes[v1].add_neighbor(new_instance.nodes[v2])
-            new_instance.init_nodes = [new_instance.nodes[node_id] for node_id in starting_nodes_ids]
-        return new_instance
+                start, end = map(int, line.split())
+                v1.append(start)
+                v2.append(end)
+        return cls.from_edges(nodes_number, v1, v2, starting_nodes_ids)
+
+    def _set_adjacency(self, v1, v2):
+        # store every undirected edge in both directions, duplicates are merged
+        n = self.nodes_number
+        keys = np.unique(np.concatenate((v1 * n + v2, v2 * n + v1)))
+        sources = keys // n
+        self.indices = (keys % n).astype(np.int32)
+        self.indptr = np.zeros(n + 1, dtype=np.int32)
+        np.cumsum(np.bincount(sources, minlength=n), out=self.indptr[1:])
+        self.indptr.flags.writeable = False
+        self.indices.flags.writeable = False
+        self.binary_path = None
+        self._edges = None
+        self._edge_list = None
 
     def print_graph(self):
         """ For the time being a dumb method to help with debugging """
@@ -67,33 +227,251 @@ class Graph(object):
             logger.info("Node {}: {}".format(node.id, node.state))
 
     def reset_state(self):
-        for v in self.nodes.values():
-            v.reset_state()
-        self.burning_nodes = list()
+        self.state.fill(UNTOUCHED)
 
     def set_init_nodes_on_fire(self):
-        for node in self.init_nodes:
-            self.set_node_as_burning(node)
+        self.state[self.init_nodes_ids] = BURNING
 
     def set_node_as_burning(self, node):
-        self.burning_nodes.append(self.nodes[node.id])
         node.set_as_burning()
 
 
+def text_to_binary(input_file, output_file, chunk_size=TEXT_CHUNK_SIZE):
+    """ Converts graph from the text format to the binary one (see Graph.save_binary) with the CSR arrays
+        built directly in the memory-mapped output file, so neither the edge list nor the adjacency has to fit
+        in memory.
+    """
+    with open(input_file, 'rb') as f:
+        nodes_number, starting_nodes_ids = _read_text_header(f)
+
+    edges_to_binary(nodes_number, lambda: _read_edge_chunks(input_file, chunk_size), starting_nodes_ids,
+                    output_file, chunk_size // 8)
+
+
+def edges_to_binary(nodes_number, edge_chunks, starting_nodes_ids, output_file, block_size=TEXT_CHUNK_SIZE // 8):
+    """ Writes graph in the binary format (see Graph.save_binary) from edges streamed in chunks,
+        building the CSR arrays directly in the memory-mapped output file.
+
+    :param edge_chunks: () -> iterator of (v1, v2) arrays of edge endpoints, called once per pass (see _build_csr),
+        so it has to yield the same edges every time
+    """
+    indptr_offset = BINARY_HEADER_SIZE
+    indices_offset = indptr_offset + (nodes_number + 1) * _BINARY_ARRAY_TYPE.itemsize
+
+    allocated = list()
+
+    def allocate_indices(length):
+        # room for all entries before merging duplicates, the file is cut to the merged size afterwards
+        with open(output_file, 'wb') as f:
+            f.truncate(indices_offset + max(length, 1) * _BINARY_ARRAY_TYPE.itemsize)
+        allocated.append(np.memmap(output_file, dtype=_BINARY_ARRAY_TYPE, mode='r+', offset=indices_offset,
+                                   shape=(max(length, 1),)))
+        return allocated[-1]
+
+    indptr, indices = _build_csr(nodes_number, edge_chunks, allocate_indices, block_size)
+    indices_length = len(indices)
+    # the merged prefix isn't a memory map when it's empty
+    allocated[0].flush()
+    del indices, allocated[:]
+
+    starting_nodes_ids = np.asarray(starting_nodes_ids, dtype=_BINARY_ARRAY_TYPE)
+    header = np.array([BINARY_VERSION, nodes_number, indices_length, len(starting_nodes_ids)],
+                      dtype=_BINARY_HEADER_TYPE)
+    with open(output_file, 'r+b') as f:
+        f.write(BINARY_MAGIC)
+        f.write(header.tostring())
+        f.write(np.asarray(indptr, dtype=_BINARY_ARRAY_TYPE).tostring())
+        f.seek(indices_offset + indices_length * _BINARY_ARRAY_TYPE.itemsize)
+        f.write(starting_nodes_ids.tostring())
+        f.truncate()
+
+
+def _read_text_header(f):
+    """ :return: (nodes number, starting nodes ids) from the first two lines of a text graph file """
+    nodes_number, _ = map(int, f.readline().split())
+    starting_nodes_ids = [int(s) for s in f.readline().split()]
+    if any(not 0 <= node_id < nodes_number for node_id in starting_nodes_ids):
+        raise ValueError('Starting vertex id out of range [0, {}) in {}'.format(nodes_number, f.name))
+    return nodes_number, starting_nodes_ids
+
+
+_WHITESPACE = np.zeros(256, dtype=np.bool_)
+_WHITESPACE[[ord(c) for c in ' \t\n\r\v\f']] = True
+_DIGITS = np.zeros(256, dtype=np.bool_)
+_DIGITS[[ord(c) for c in '0123456789']] = True
+_SIGNS = np.zeros(256, dtype=np.bool_)
+_SIGNS[[ord(c) for c in '+-']] = True
+
+
+def _count_tokens(text):
+    """ Number of whitespace separated tokens in text """
+    is_space = _WHITESPACE[np.frombuffer(text, dtype=np.uint8)]
+    return int(np.count_nonzero(is_space[:-1] & ~is_space[1:])) + int(not is_space[0])
+
+
+def _only_integers(data):
+    """ Whether bytes of data are only whitespace separated integers, signs only at their starts """
+    is_space, is_digit, is_sign = _WHITESPACE[data], _DIGITS[data], _SIGNS[data]
+    if not (is_space | is_digit | is_sign).all():
+        return False
+    sign_starts_token = np.concatenate(([True], is_space[:-1])) & np.concatenate((is_digit[1:], [False]))
+    return bool(sign_starts_token[is_sign].all())
+
+
+def _parse_edges(text, nodes_number):
+    """ :return: (v1, v2) arrays of edge endpoints from a part of the edge list, that ends at the end of a line
+        :raise ValueError: if the text contains anything but vertex ids in range [0, nodes_number)
+    """
+    if not text or text.isspace():
+        # fromstring parses whitespace alone as a single 0
+        values = np.zeros(0, dtype=np.int64)
+    else:
+        if not _only_integers(np.frombuffer(text, dtype=np.uint8)):
+            raise ValueError('a token, that is not an integer')
+        values = np.fromstring(text, dtype=np.int64, sep=' ')
+        # fromstring silently stops at the first token, it can't parse
+        if values.size != _count_tokens(text):
+            raise ValueError('a token, that is not an integer, after {} vertex ids'.format(values.size))
+    if values.size % 2:
+        raise ValueError('an odd number of vertex ids')
+    if values.size and (values.min() < 0 or values.max() >= nodes_number):
+        raise ValueError('a vertex id out of range [0, {})'.format(nodes_number))
+    edges = values.reshape(-1, 2)
+    return edges[:, 0], edges[:, 1]
+
+
+def _read_edge_chunks(input_file, chunk_size=TEXT_CHUNK_SIZE):
+    """ Yields pairs of arrays (v1, v2) of edge endpoints, parsed from consecutive chunks of about chunk_size bytes
+        of the edge list of a text graph file
+
+        :raise ValueError: naming the file, if the edge list is malformed (see _parse_edges)
+    """
+    with open(input_file, 'rb') as f:
+        nodes_number, _ = _read_text_header(f)
+        rest = b''
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                break
+            data = rest + data
+            end = data.rfind(b'\n') + 1
+            rest = data[end:]
+            if end:
+                yield _parse_chunk(input_file, data[:end], nodes_number)
+        if rest.strip():
+            yield _parse_chunk(input_file, rest, nodes_number)
+
+
+def _parse_chunk(input_file, text, nodes_number):
+    try:
+        return _parse_edges(text, nodes_number)
+    except ValueError as e:
+        raise ValueError('Edge list of {} contains {}'.format(input_file, e))
+
+
+def _build_csr(nodes_number, edge_chunks, allocate_indices, block_size=TEXT_CHUNK_SIZE // 8):
+    """ CSR adjacency (same as Graph._set_adjacency builds) from edges streamed in chunks, in three passes:
+        1. count degrees of nodes
+        2. scatter both directions of each edge into its row
+        3. sort each row and merge duplicates, in blocks of about block_size entries, compacting indices in place
+        Apart from the CSR arrays, only a single chunk or block is kept in memory.
+
+    :param edge_chunks: () -> iterator of (v1, v2), called once per pass
+    :param allocate_indices: (length) -> int32 array to fill, may be a memory map
+    :return: (indptr, indices), indices is a prefix of the allocated array
+    """
+    n = nodes_number
+    degrees = np.zeros(n, dtype=np.int64)
+    for v1, v2 in edge_chunks():
+        degrees += np.bincount(v1, minlength=n)
+        degrees += np.bincount(v2, minlength=n)
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(degrees, out=indptr[1:])
+
+    indices = allocate_indices(int(indptr[-1]))
+    cursor = indptr[:-1].copy()
+    for v1, v2 in edge_chunks():
+        if not len(v1):
+            continue
+        # sorting keys is much faster than argsort of sources, rows are sorted again in the last pass anyway
+        keys = np.concatenate((v1 * n + v2, v2 * n + v1))
+        keys.sort()
+        sources = keys // n
+        targets = keys - sources * n
+        group_starts = np.concatenate(([0], np.flatnonzero(np.diff(sources)) + 1))
+        group_sizes = np.diff(np.append(group_starts, len(sources)))
+        rank_in_group = np.arange(len(sources)) - np.repeat(group_starts, group_sizes)
+        indices[cursor[sources] + rank_in_group] = targets
+        cursor[sources[group_starts]] += group_sizes
+
+    merged_indptr = np.zeros(n + 1, dtype=np.int64)
+    written = 0
+    row = 0
+    while row < n:
+        end = max(int(np.searchsorted(indptr, indptr[row] + block_size, side='right')) - 1, row + 1)
+        end = min(end, n)
+        local_rows = np.repeat(np.arange(end - row, dtype=np.int64), np.diff(indptr[row:end + 1]))
+        keys = np.unique(local_rows * n + indices[indptr[row]:indptr[end]])
+        indices[written:written + len(keys)] = keys % n
+        merged_indptr[row + 1:end + 1] = written + np.cumsum(np.bincount(keys // n, minlength=end - row))
+        written += len(keys)
+        row = end
+
+    return merged_indptr.astype(np.int32), indices[:written]
+
+
+def is_binary_file(path):
+    with open(path, 'rb') as f:
+        return f.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+
+def _map_binary(path):
+    """ :return: (indptr, indices, init_nodes_ids) memory-mapped from a binary graph file """
+    with open(path, 'rb') as f:
+        if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+            raise ValueError('{} is not a binary graph file'.format(path))
+        version, nodes_number, indices_length, init_nodes_number = np.fromstring(f.read(4 * 8),
+                                                                                 dtype=_BINARY_HEADER_TYPE)
+    if version != BINARY_VERSION:
+        raise ValueError('Unsupported binary graph version {} in {}'.format(version, path))
+
+    lengths = (nodes_number + 1, indices_length, init_nodes_number)
+    arrays = list()
+    offset = BINARY_HEADER_SIZE
+    for length in lengths:
+        if length:
+            arrays.append(np.memmap(path, dtype=_BINARY_ARRAY_TYPE, mode='r', offset=offset, shape=(length,)))
+        else:
+            # empty memory maps are not allowed
+            arrays.append(np.zeros(0, dtype=_BINARY_ARRAY_TYPE))
+        offset += length * _BINARY_ARRAY_TYPE.itemsize
+    return tuple(arrays)
+
+
 class Node(object):
-    def __init__(self, node_id, value=None):
+    """ View of a single vertex of the Graph, all data is kept in the graph arrays """
+
+    def __init__(self, graph, node_id, value=None):
+        self.graph = graph
         self.id = node_id
-        self.neighbors = set()
-        self.state = NodeState.UNTOUCHED
         self.value = value
         super(Node, self).__init__()
 
-    def add_neighbor(self, node):
-        self.neighbors.add(node)
-        node.neighbors.add(self)
+    @property
+    def neighbors(self):
+        return set(self.get_neighbors())
+
+    @property
+    def state(self):
+        return NodeState(self.graph.state[self.id])
+
+    @state.setter
+    def state(self, state):
+        self.graph.state[self.id] = state.value
 
     def get_neighbors(self):
-        return self.neighbors
+        nodes = self.graph.nodes
+        return [nodes[node_id] for node_id in self.graph.neighbors(self.id).tolist()]
 
     def print_node(self):
         """ Print the graph structure accessible from this node """
@@ -108,6 +486,8 @@ class Node(object):
     def __eq__(self, other):
         return self.id == other.id
 
+    def __hash__(self):
+        return hash(self.id)
+
     def __str__(self):
         return "Node({})".format(self.id)
-
@@ -0,0 +1,118 @@
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+
+from graph import Graph, is_binary_file, text_to_binary
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+DEFAULT_MAX_GRAPHS = 16
+
+_SUFFIX = '.bgraph'
+# common limit of file name length on Linux file systems
+_MAX_NAME_LENGTH = 255
+
+
+def _file_name(key):
+    """ Readable name made of the key parts, or the first part and a hash of the key when the parts don't make
+        a valid file name (paths of input files, too long names)
+    """
+    name = "_".join(repr(part) if isinstance(part, float) else str(part) for part in key)
+    if os.sep in name or (os.altsep and os.altsep in name) or len(name) + len(_SUFFIX) > _MAX_NAME_LENGTH:
+        name = "{}_{}".format(key[0], hashlib.sha1(repr(key)).hexdigest())
+    return name + _SUFFIX
+
+
+class GraphCache(object):
+    """ Graphs by the parameters they were generated (or converted) from, kept in two levels:
+        - registry of loaded graphs in the process, at most max_graphs of them, least recently used dropped first
+        - binary graph files in the directory, at most max_bytes in total, least recently used removed first;
+          a file is touched whenever it's used, so its modification time is its last use, also across processes
+
+        Binary graphs are memory-mapped, so all graphs loaded from one file share the adjacency in the page cache.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, max_graphs=DEFAULT_MAX_GRAPHS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_graphs = max_graphs
+        self._graphs = OrderedDict()
+
+    def path(self, key):
+        return os.path.join(self.directory, _file_name(key))
+
+    def get(self, key, write_binary):
+        """ :param key: tuple of generation parameters (including the seed), made of strings and numbers
+            :param write_binary: (path) -> None, writes the graph in the binary format to path, called on a miss
+            :return: Graph, the same instance for repeated calls while it's in the registry
+        """
+        graph = self._graphs.pop(key, None)
+        path = self.path(key)
+        if os.path.isfile(path):
+            os.utime(path, None)
+        elif graph is None:
+            self._write(path, write_binary)
+        if graph is None:
+            graph = Graph.from_binary(path)
+
+        self._remember(key, graph)
+        self._evict()
+        return graph
+
+    def get_file(self, input_file):
+        """ Graph from a file, text ones are converted to the binary format once and cached until they change """
+        stat = os.stat(input_file)
+        if not is_binary_file(input_file):
+            key = ('file', os.path.abspath(input_file), stat.st_mtime, stat.st_size)
+            return self.get(key, lambda path: text_to_binary(input_file, path))
+
+        key = ('binary', os.path.abspath(input_file), stat.st_mtime, stat.st_size)
+        graph = self._graphs.pop(key, None)
+        if graph is None:
+            graph = Graph.from_binary(input_file)
+        self._remember(key, graph)
+        return graph
+
+    def _remember(self, key, graph):
+        self._graphs[key] = graph
+        while len(self._graphs) > self.max_graphs:
+            self._graphs.popitem(last=False)
+
+    def _write(self, path, write_binary):
+        # written to a temporary file first, so other processes never map a partially written graph
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        handle, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(handle)
+        try:
+            write_binary(temporary_path)
+            os.rename(temporary_path, path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+
+    def _evict(self):
+        """ Removes least recently used files until they fit in max_bytes, files of graphs in the registry stay """
+        if not os.path.isdir(self.directory):
+            return
+        files = list()
+        for name in os.listdir(self.directory):
+            if name.endswith(_SUFFIX):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    # removed by another process in the meantime
+                    continue
+                files.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in files)
+        in_use = set(graph.binary_path for graph in self._graphs.itervalues())
+        for _, size, name in sorted(files):
+            if total <= self.max_bytes:
+                break
+            path = os.path.abspath(os.path.join(self.directory, name))
+            if path not in in_use:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                total -= size
@@ -0,0 +1,148 @@
+""" Streaming generators of large graphs of common topologies. Each generator yields edges in chunks of
+    (v1, v2) int64 arrays and, given the same seed, yields the same edges every time it is called, so the graph
+    can be written in several passes (see graph.edges_to_binary) without ever being held in memory as a whole.
+    Seed None draws a different graph on each call, so multi-pass writers need a concrete seed
+    (see generate.family_edges).
+"""
+import array
+import math
+import random
+
+import numpy as np
+
+# approximate number of edges per yielded chunk
+EDGES_CHUNK = 10 ** 6
+
+
+def _chunk(v1, v2):
+    return np.asarray(v1, dtype=np.int64), np.asarray(v2, dtype=np.int64)
+
+
+def scale_free_edges(vertices_num, attachments, seed=None):
+    """ Barabasi-Albert preferential attachment: each new node is linked to `attachments` distinct older nodes,
+        picked with probability proportional to their degree. The first new node is linked to all of
+        the `attachments` initial ones, so the graph is connected. O(V + E) time.
+        Picking a random endpoint of the edges so far is picking proportionally to degree. Sources of edges
+        follow from the edge index, so only targets are stored: unlike the other families, memory is not
+        bounded by the chunk size but grows with the graph, 4 bytes per edge.
+    """
+    if not 0 < attachments < vertices_num:
+        raise ValueError("Number of attachments has to be in range [1..vertices - 1]")
+
+    rand = random.Random(seed).random
+    m = attachments
+    # target of edge i, the source of edge i is m + i // m
+    targets_so_far = array.array('i', [0]) * (m * (vertices_num - m))
+    edges_num = 0
+    v1, v2 = list(), list()
+    for node in xrange(m, vertices_num):
+        if node == m:
+            targets = range(m)
+        else:
+            chosen = set()
+            while len(chosen) < m:
+                # endpoint 2 * i is the source of edge i, 2 * i + 1 its target
+                endpoint = int(rand() * 2 * edges_num)
+                edge = endpoint >> 1
+                chosen.add(targets_so_far[edge] if endpoint & 1 else m + edge // m)
+            targets = sorted(chosen)
+        for target in targets:
+            targets_so_far[edges_num] = target
+            edges_num += 1
+        v1.extend([node] * m)
+        v2.extend(targets)
+        if len(v1) >= EDGES_CHUNK:
+            yield _chunk(v1, v2)
+            v1, v2 = list(), list()
+    if v1:
+        yield _chunk(v1, v2)
+
+
+def grid_edges(rows, columns):
+    """ 2D lattice, node (row, column) has id row * columns + column and is linked to its right and lower
+        neighbours. Deterministic, O(columns) memory per row of nodes.
+    """
+    rows_per_chunk = max(1, EDGES_CHUNK // (2 * columns))
+    for first_row in xrange(0, rows, rows_per_chunk):
+        last_row = min(first_row + rows_per_chunk, rows)
+        nodes = np.arange(first_row * columns, last_row * columns, dtype=np.int64)
+        right = nodes[nodes % columns != columns - 1]
+        down = nodes[nodes < (rows - 1) * columns]
+        yield np.concatenate((right, down)), np.concatenate((right + 1, down + columns))
+
+
+# neighbouring cells checked for each cell (dx, dy), half of them - the other half sees the pairs from its side
+_FORWARD_CELLS = ((0, 0), (0, 1), (1, -1), (1, 0), (1, 1))
+
+
+def random_geometric_edges(vertices_num, radius, seed=None):
+    """ Random geometric graph: nodes are random points of the unit square, linked when closer than radius.
+        Points are binned into square cells of side at least radius, so only pairs from neighbouring cells
+        are compared: O(V + E) expected time, O(V) memory for the points.
+        Nodes are numbered cell by cell, so close nodes have close ids, as in typical dumps of road networks.
+        The graph is connected only with high probability, for radius well above sqrt(log(V) / (pi * V)).
+    """
+    if not 0 < radius:
+        raise ValueError("Radius has to be positive")
+
+    state = np.random.RandomState(seed)
+    points = state.random_sample((vertices_num, 2))
+    side = max(1, min(int(1 / radius), int(math.sqrt(vertices_num))))
+    cell_xy = np.minimum((points * side).astype(np.int64), side - 1)
+    cells = cell_xy[:, 0] * side + cell_xy[:, 1]
+    order = np.argsort(cells, kind='mergesort')
+    points, cell_xy, cells = points[order], cell_xy[order], cells[order]
+    cell_starts = np.searchsorted(cells, np.arange(side * side + 1))
+    del order
+
+    # points per chunk, so that about EDGES_CHUNK candidate pairs are compared at once
+    candidates_per_point = len(_FORWARD_CELLS) * float(vertices_num) / (side * side)
+    chunk_points = max(1, int(EDGES_CHUNK / max(candidates_per_point, 1)))
+    squared_radius = radius * radius
+    for first in xrange(0, vertices_num, chunk_points):
+        nodes = np.arange(first, min(first + chunk_points, vertices_num), dtype=np.int64)
+        v1, v2 = list(), list()
+        for dx, dy in _FORWARD_CELLS:
+            x, y = cell_xy[nodes, 0] + dx, cell_xy[nodes, 1] + dy
+            valid = (x < side) & (y >= 0) & (y < side)
+            sources = nodes[valid]
+            neighbour_cells = x[valid] * side + y[valid]
+            starts = cell_starts[neighbour_cells]
+            if (dx, dy) == (0, 0):
+                # pairs within a cell only once
+                starts = sources + 1
+            counts = np.maximum(cell_starts[neighbour_cells + 1] - starts, 0)
+            sources = np.repeat(sources, counts)
+            offsets = np.arange(len(sources)) - np.repeat(np.cumsum(counts) - counts, counts)
+            targets = np.repeat(starts, counts) + offsets
+            close = ((points[sources] - points[targets]) ** 2).sum(axis=1) <= squared_radius
+            v1.append(sources[close])
+            v2.append(targets[close])
+        yield np.concatenate(v1), np.concatenate(v2)
+
+
+def small_world_edges(vertices_num, neighbours, rewiring_probability, seed=None):
+    """ Watts-Strogatz small world: ring lattice where each node is linked to `neighbours` nearest nodes
+        (half on each side), then the far end of each edge is moved to a random node with rewiring_probability.
+        Rewired edges may duplicate existing ones; duplicates are merged when the graph is loaded.
+        O(V + E) time, memory bounded by the chunk size.
+    """
+    if neighbours % 2 or not 0 < neighbours < vertices_num:
+        raise ValueError("Number of neighbours has to be even and in range [2..vertices - 1]")
+
+    state = np.random.RandomState(seed)
+    half = neighbours // 2
+    nodes_per_chunk = max(1, EDGES_CHUNK // half)
+    for first in xrange(0, vertices_num, nodes_per_chunk):
+        nodes = np.arange(first, min(first + nodes_per_chunk, vertices_num), dtype=np.int64)
+        v1, v2 = list(), list()
+        for distance in xrange(1, half + 1):
+            targets = (nodes + distance) % vertices_num
+            rewired = state.random_sample(len(nodes)) < rewiring_probability
+            # random node other than the source
+            random_targets = state.randint(0, vertices_num - 1, size=rewired.sum())
+            random_targets += random_targets >= nodes[rewired]
+            targets[rewired] = random_targets
+            v1.append(nodes)
+            v2.append(targets)
+        yield np.concatenate(v1), np.concatenate(v2)
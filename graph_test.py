@@ -0,0 +1,99 @@
+""" Checks the graph loaders against Graph.from_file_by_lines kept as the reference: text files parsed at once,
+    in small chunks and converted to the binary format (directly and through save_binary) have to give the same
+    adjacency and starting nodes. Malformed edge lists have to be rejected with a ValueError naming the file.
+"""
+import os
+import random
+import shutil
+import tempfile
+
+import numpy as np
+
+from generate import generate_file_data
+from graph import Graph, text_to_binary
+
+# edge cases, that random graphs rarely hit: no edges, duplicates (also reversed), isolated nodes,
+# no new line at the end, extra whitespace
+SPECIAL_GRAPHS = [
+    "3 0\n0\n",
+    "1 0\n0\n",
+    "4 4\n0 3\n0 1\n1 0\n0 1\n2 1",
+    "5 2\n4\n  0   4 \n3\t2\n",
+]
+
+MALFORMED_GRAPHS = [
+    ("3 1\n0\n0 1.5\n", "not an integer"),
+    ("3 1\n0\n0 1e2\n", "not an integer"),
+    ("3 1\n0\n0 x\n", "not an integer"),
+    ("3 1\n0\n0 1-2\n", "not an integer"),
+    ("3 1\n0\n0 -\n", "not an integer"),
+    ("3 1\n0\n0 3\n", "out of range"),
+    ("3 1\n0\n-1 2\n", "out of range"),
+    ("3 1\n0\n0 1 2\n", "odd number"),
+    ("3 1\n3\n0 1\n", "out of range"),
+]
+
+
+def _same_graphs(graph, reference):
+    return (graph.nodes_number == reference.nodes_number and
+            np.array_equal(graph.indptr, reference.indptr) and
+            np.array_equal(graph.indices, reference.indices) and
+            np.array_equal(graph.init_nodes_ids, reference.init_nodes_ids))
+
+
+def _check_loaders(directory, text_file):
+    reference = Graph.from_file_by_lines(text_file)
+    binary_file = os.path.join(directory, 'converted.bgraph')
+    saved_file = os.path.join(directory, 'saved.bgraph')
+
+    loaded = [('from_file', Graph.from_file(text_file))]
+    for chunk_size in (1, 7, 64):
+        text_to_binary(text_file, binary_file, chunk_size)
+        loaded.append(('text_to_binary in chunks of {}'.format(chunk_size), Graph.from_file(binary_file)))
+    reference.save_binary(saved_file)
+    loaded.append(('save_binary', Graph.from_file(saved_file)))
+
+    for name, graph in loaded:
+        assert _same_graphs(graph, reference), "{} differs from the reference for {}".format(name, text_file)
+
+
+def _check_malformed(directory, content, problem):
+    text_file = os.path.join(directory, 'malformed.rgraph')
+    with open(text_file, 'w') as f:
+        f.write(content)
+    for name, load in [('from_file', Graph.from_file),
+                       ('text_to_binary', lambda path: text_to_binary(path, os.path.join(directory, 'bad.bgraph')))]:
+        try:
+            load(text_file)
+        except ValueError as e:
+            assert text_file in str(e) and problem in str(e), "{} gives a wrong error for {!r}: {}".format(
+                name, content, e)
+        else:
+            raise AssertionError("{} accepts {!r}".format(name, content))
+
+
+if __name__ == '__main__':
+
+    random.seed(1)
+    directory = tempfile.mkdtemp()
+
+    try:
+        text_file = os.path.join(directory, 'graph.rgraph')
+        for content in SPECIAL_GRAPHS:
+            with open(text_file, 'w') as f:
+                f.write(content)
+            _check_loaders(directory, text_file)
+
+        for _ in xrange(20):
+            vertices = random.randint(2, 300)
+            # the generator needs density of at least 2 / vertices for a connected graph
+            density = min(1.0, random.uniform(2.0, 10.0) / vertices)
+            generate_file_data(text_file, vertices, density, random.randint(1, 2))
+            _check_loaders(directory, text_file)
+
+        for content, problem in MALFORMED_GRAPHS:
+            _check_malformed(directory, content, problem)
+    finally:
+        shutil.rmtree(directory)
+
+    print "All graph loaders match the reference"
@@ -0,0 +1,274 @@
+import argparse
+import os
+import random
+import traceback
+from Queue import Empty
+from logging import getLogger
+from multiprocessing import Process, Queue
+
+import numpy as np
+
+from frameworks import AlgoIn, AlgoOut, ga_framework, find_n_best_solutions, sort_by_score, DEFAULTS, IterBoundSC
+from logging_configs import configure_logging
+from operators import SELECTION, CROSSOVER, MUTATION, SUCCESSION
+from solvers import ConfigurableSimpleSolver, load_input_graph
+
+logger = getLogger("islands")
+
+# how often (in seconds) blocked islands and the parent process check if the others are still alive
+POLL_INTERVAL = 1.0
+
+
+def ring_topology(islands_number):
+    """ Each island sends its migrants to the next one """
+    if islands_number < 2:
+        return [[] for _ in xrange(islands_number)]
+    return [[(i + 1) % islands_number] for i in xrange(islands_number)]
+
+
+def fully_connected_topology(islands_number):
+    """ Each island sends its migrants to all the others """
+    return [[j for j in xrange(islands_number) if j != i] for i in xrange(islands_number)]
+
+
+TOPOLOGIES = {
+    "ring": ring_topology,
+    "full": fully_connected_topology,
+}
+
+
+class Island(object):
+    """ Configuration of a single island, operators are given by their names (see operators module) """
+
+    def __init__(self, population_size=10, selection="roulette", crossover="injection", mutation="single_swap",
+                 succession="best"):
+        self.population_size = population_size
+        self.selection = selection
+        self.crossover = crossover
+        self.mutation = mutation
+        self.succession = succession
+
+    def __str__(self):
+        return "{}_{}_{}_{}_{}".format(self.population_size, self.selection, self.crossover, self.mutation,
+                                       self.succession)
+
+
+class IslandSolver(ConfigurableSimpleSolver):
+    """ ConfigurableSimpleSolver, that every migration_interval iterations sends its best specimens to outboxes
+        and replaces its worst specimens with the ones received from inbox (from incoming_number islands).
+    """
+
+    def __init__(self, migration_interval, migrants_number, inbox, outboxes, incoming_number, parent_pid=None,
+                 **kwargs):
+        super(IslandSolver, self).__init__(**kwargs)
+
+        self.migration_interval = migration_interval
+        self.migrants_number = migrants_number
+        self.inbox = inbox
+        self.outboxes = outboxes
+        self.incoming_number = incoming_number
+        # island gives up waiting for immigrants once the process that started it is gone
+        self.parent_pid = parent_pid
+
+    def migration(self, es):
+        if (es.current_iteration + 1) % self.migration_interval:
+            return es.population
+
+        emigrants = find_n_best_solutions(es.population, self.migrants_number)
+        for outbox in self.outboxes:
+            outbox.put(emigrants)
+
+        immigrants = list()
+        for _ in xrange(self.incoming_number):
+            immigrants.extend(self._receive())
+
+        survivors_number = max(len(es.population) - len(immigrants), 0)
+        return sort_by_score(es.population)[:survivors_number] + immigrants
+
+    def _receive(self):
+        while True:
+            try:
+                return self.inbox.get(timeout=POLL_INTERVAL)
+            except Empty:
+                if self.parent_pid is not None and os.getppid() != self.parent_pid:
+                    raise RuntimeError("Parent process is gone, no more immigrants will come")
+
+
+def _run_island(index, island, params, migration_interval, migrants_number, seed, inbox, outboxes,
+                incoming_number, parent_pid, results):
+    """ Puts (index, AlgoOut, None) to results, or (index, None, formatted traceback) if the island failed """
+    try:
+        # forked islands would share the random state otherwise
+        random.seed(seed)
+        np.random.seed(seed)
+
+        params.operators = IslandSolver(
+            migration_interval,
+            migrants_number,
+            inbox,
+            outboxes,
+            incoming_number,
+            parent_pid,
+            population_size=island.population_size,
+            selection_op=SELECTION[island.selection],
+            crossover_op=CROSSOVER[island.crossover],
+            mutation_op=MUTATION[island.mutation],
+            succession_op=SUCCESSION[island.succession],
+        )
+        results.put((index, ga_framework(params), None))
+    except Exception:
+        results.put((index, None, traceback.format_exc()))
+
+
+def _collect_results(processes, results):
+    """ :return: list of AlgoOut of all islands, the first failure of an island is raised as RuntimeError
+        after terminating the other islands
+    """
+    islands_outs = [None] * len(processes)
+    pending = set(xrange(len(processes)))
+    while pending:
+        try:
+            index, algo_out, error = results.get(timeout=POLL_INTERVAL)
+        except Empty:
+            # islands that exit cleanly have put their results already, so only a crash ends with non-zero code
+            crashed = [i for i in pending if processes[i].exitcode not in (None, 0)]
+            if not crashed:
+                continue
+            index, algo_out = crashed[0], None
+            error = "Island process exited with code {}".format(processes[index].exitcode)
+
+        if error is not None:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+            raise RuntimeError("Island {} failed:\n{}".format(index, error))
+
+        pending.discard(index)
+        islands_outs[index] = algo_out
+    return islands_outs
+
+
+def _merge_results(islands_outs):
+    best_out = max(islands_outs, key=lambda algo_out: algo_out.best_solution_score.to_fitness())
+
+    iteration_results = dict()
+    iteration_evaluations = dict()
+    for algo_out in islands_outs:
+        for i, max_saved in algo_out.iteration_results.iteritems():
+            iteration_results[i] = max(iteration_results.get(i, max_saved), max_saved)
+        for i, evaluations in algo_out.iteration_evaluations.iteritems():
+            iteration_evaluations[i] = iteration_evaluations.get(i, 0) + evaluations
+
+    return AlgoOut(best_out.best_solution, best_out.best_solution_score, iteration_results, iteration_evaluations,
+                   islands=islands_outs)
+
+
+def island_framework(params, islands, migration_interval, migrants_number, topology="ring"):
+    """ Runs ga_framework for each island in a separate process. Islands exchange their best specimens
+        every migration_interval iterations, with the islands given by topology.
+
+        Migration is synchronous, so all islands have to stop after the same number of iterations: only IterBoundSC
+        is accepted as the stop condition. Steady state and population matrix loops are not supported.
+        If any island fails, the others are terminated and the failure is raised as RuntimeError.
+
+    :param params: AlgoIn shared by all islands, its operators are replaced with IslandSolver of each island
+    :param islands: list of Island
+    :return: AlgoOut of the best island, with results of all islands merged and kept in AlgoOut.islands
+    """
+    if not isinstance(params.stop_condition, IterBoundSC):
+        raise ValueError("Islands have to stop after the same number of iterations, only IterBoundSC is supported")
+    if params.steady_state or params.population_matrix:
+        raise ValueError("Islands support neither steady state nor population matrix")
+
+    targets = TOPOLOGIES[topology](len(islands))
+    inboxes = [Queue() for _ in islands]
+    results = Queue()
+
+    parent_pid = os.getpid()
+    processes = list()
+    for index, island in enumerate(islands):
+        outboxes = [inboxes[target] for target in targets[index]]
+        incoming_number = sum(targets_list.count(index) for targets_list in targets)
+        seed = random.getrandbits(32)
+        processes.append(Process(target=_run_island,
+                                 args=(index, island, params, migration_interval, migrants_number, seed,
+                                       inboxes[index], outboxes, incoming_number, parent_pid, results)))
+    for process in processes:
+        process.start()
+
+    islands_outs = _collect_results(processes, results)
+    for index, algo_out in enumerate(islands_outs):
+        logger.info("Island {} ({}) finished, best score: {}".format(index, islands[index],
+                                                                     algo_out.best_solution_score))
+    for process in processes:
+        process.join()
+
+    return _merge_results(islands_outs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('-in', '--input_file',
+                        help='file containing graph')
+    parser.add_argument('-d', '--density',
+                        help='edges density; float in range [0..1]',
+                        type=float,
+                        default=0.2)
+    parser.add_argument('-f', '--ffs',
+                        help='number of firefighters per step',
+                        type=int,
+                        default=DEFAULTS['ffs_per_step'])
+    parser.add_argument('-i', '--iters',
+                        help='number of algorithm iterations',
+                        type=int,
+                        default=DEFAULTS['algo_iter_no'])
+    parser.add_argument('-s', '--starting_vertices',
+                        help='number of starting vertices',
+                        type=int,
+                        default=1)
+    parser.add_argument('-v', '--vertices',
+                        help='number of vertices in graph',
+                        type=int,
+                        default=10)
+    parser.add_argument('-l', '--loggers',
+                        help='configuration of loggers (i.e. islands=info,per_iter_stats=info)',
+                        default='islands=info')
+    parser.add_argument('-p', '--population_size',
+                        help='size of the population of each island',
+                        type=int,
+                        default=10)
+    parser.add_argument('-n', '--islands',
+                        help='number of islands',
+                        type=int,
+                        default=4)
+    parser.add_argument('-o', '--operators',
+                        help='operators of islands as selection:crossover:mutation:succession, '
+                             'islands use given sets in turns',
+                        nargs='+',
+                        default=['roulette:injection:single_swap:best'])
+    parser.add_argument('-k', '--migration_interval',
+                        help='number of iterations between migrations',
+                        type=int,
+                        default=10)
+    parser.add_argument('-m', '--migrants',
+                        help='number of specimens each island sends in a migration',
+                        type=int,
+                        default=2)
+    parser.add_argument('-t', '--topology',
+                        help='migration topology',
+                        choices=TOPOLOGIES.keys(),
+                        default='ring')
+
+    args = parser.parse_args()
+
+    configure_logging(args.loggers)
+    g = load_input_graph((args.vertices, args.density, args.starting_vertices), args.input_file)
+
+    operator_sets = [operators.split(':') for operators in args.operators]
+    islands_config = [Island(args.population_size, *operator_sets[i % len(operator_sets)])
+                      for i in xrange(args.islands)]
+
+    algo_out = island_framework(AlgoIn(g, iter_no=args.iters, ffs_per_step=args.ffs, gather_iteration_stats=True),
+                                islands_config, args.migration_interval, args.migrants, args.topology)
+    logger.info("Best score: {}".format(algo_out.best_solution_score))
@@ -58,6 +58,16 @@ _default = {
             'level': 'WARN',
             'propagate': True
         },
+        'fitness_cache': {
+            'handlers': ['default'],
+            'level': 'WARN',
+            'propagate': True
+        },
+        'islands': {
+            'handlers': ['default'],
+            'level': 'WARN',
+            'propagate': True
+        },
     }
 }
 
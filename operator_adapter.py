@@ -3,19 +3,43 @@
 # * use AlgoScore in operators (provide function for decomposing population)
 # * prepare configurable adapter
 
+import numpy as np
+
+from population_matrix import PopulationMatrix
+
+
+def _to_list(specimen):
+    return specimen.tolist() if isinstance(specimen, np.ndarray) else specimen
+
+
+def _like(specimen, template):
+    """ Specimen in the same representation (list or row of population matrix) as template """
+    return np.asarray(specimen, dtype=np.int32) if isinstance(template, np.ndarray) else specimen
+
 
 def wrap_crossover(operator):
     def _wrapper(es, parents):
         parent1, parent2 = parents
-        child1, child2 = operator(parent1, parent2)
-        return [child1, child2]
+        child1, child2 = operator(_to_list(parent1), _to_list(parent2))
+        return [_like(child1, parent1), _like(child2, parent2)]
 
     return _wrapper
 
 
 def wrap_mutation(operator):
     def _wrapper(es, specimen):
-        return operator(specimen)
+        return _like(operator(_to_list(specimen)), specimen)
+
+    return _wrapper
+
+
+def wrap_batch_mutation(operator):
+    """ Adapter of operators from operators.batch_mutation for Operators.batch_mutation """
+    def _wrapper(es, specimens):
+        if not len(specimens):
+            return []
+        mutated = operator(np.array(specimens, dtype=np.int32, ndmin=2))
+        return list(mutated) if isinstance(specimens[0], np.ndarray) else mutated.tolist()
 
     return _wrapper
 
@@ -24,6 +48,14 @@ def wrap_selection(operator, parent_sets_count, specimen_count):
     def _wrapper(es):
         parent_sets = []
 
+        if isinstance(es.population, PopulationMatrix):
+            # operator selects row indices, parents are copied out of the matrix at once
+            indexed_population = es.population.indexed()
+            for i in xrange(parent_sets_count):
+                parents = es.population.specimens[operator(indexed_population, specimen_count)]
+                parent_sets.append(list(parents))
+            return parent_sets
+
         for i in xrange(parent_sets_count):
             parents = operator(es.population, specimen_count)
             parent_sets.append(parents)
@@ -35,6 +67,16 @@ def wrap_selection(operator, parent_sets_count, specimen_count):
 
 def wrap_succession(operator, population_size):
     def _wrapper(es):
+        if isinstance(es.population, PopulationMatrix):
+            survivors = operator(es.population.indexed(), population_size)
+            return es.population.take([index for index, _ in survivors])
+
         return operator(es.population, population_size)
 
     return _wrapper
+
+
+def population_scores(population):
+    """ Scores of population members as strings, for logging """
+    scores = population.scores if isinstance(population, PopulationMatrix) else [score for _, score in population]
+    return map(str, scores)
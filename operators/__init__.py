@@ -1,13 +1,21 @@
+from functools import partial
+
 import selection as sel
 import crossover as cs
 import mutation as mut
+import batch_mutation as bmut
 import succession as suc
+from sampling import AliasSampler, StochasticUniversalSampler
 
 SELECTION = {
     "noop": None,
     "tournament": sel.tournament_selection,
     "roulette": sel.roulette_wheel_selection,
     "rank": sel.rank_selection,
+    "roulette_alias": partial(sel.roulette_wheel_selection, sampler=AliasSampler),
+    "roulette_sus": partial(sel.roulette_wheel_selection, sampler=StochasticUniversalSampler),
+    "rank_alias": partial(sel.rank_selection, sampler=AliasSampler),
+    "rank_sus": partial(sel.rank_selection, sampler=StochasticUniversalSampler),
 }
 
 CROSSOVER = {
@@ -28,11 +36,20 @@ MUTATION = {
     "random_swap": mut.random_swap_mutation,
     "scramble": mut.scramble_mutation,
     "single_swap": mut.single_swap_mutation,
+    "batch_adjacent_swap": bmut.adjacent_swap_mutation,
+    "batch_insertion": bmut.insertion_mutation,
+    "batch_inversion": bmut.inversion_mutation,
+    "batch_slide": bmut.random_slide_mutation,
+    "batch_random_swap": bmut.random_swap_mutation,
+    "batch_scramble": bmut.scramble_mutation,
+    "batch_single_swap": bmut.single_swap_mutation,
 }
 
 SUCCESSION = {
     "noop": None,
     "best": suc.best,
     "rank": suc.rank_succession,
+    "rank_alias": partial(suc.rank_succession, sampler=AliasSampler),
+    "rank_sus": partial(suc.rank_succession, sampler=StochasticUniversalSampler),
     "best_then_random": suc.best_then_uniform_succession,
 }
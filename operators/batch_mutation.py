@@ -0,0 +1,145 @@
+""" Batch versions of operators from mutation module. Each of them mutates all rows of a matrix of chromosomes
+    (int32 array of shape (k, n)) at once, drawing the random numbers for all rows together.
+    Mutated rows are distributed exactly like chromosomes mutated with the single chromosome operator.
+"""
+import numpy as np
+
+
+def batch_operator(operator):
+    """ Marks operator as taking and returning a matrix of chromosomes (see operator_adapter.wrap_batch_mutation) """
+    operator.batch = True
+    return operator
+
+
+def _randint(low, high):
+    """ Like random.randint (inclusive bounds) for each pair of low and high arrays """
+    return low + np.floor(np.random.random_sample(len(low)) * (high - low + 1)).astype(np.int64)
+
+
+def _distinct_pairs(k, low, high):
+    """ k pairs of distinct positions, uniform in [low, high] (like random.sample(range, 2)) """
+    first = _randint(low, high)
+    second = _randint(low, high - 1)
+    second += second >= first
+    return first, second
+
+
+def _permute_rows(chromosomes, columns):
+    """ Row i of result takes positions columns[i] of row i of chromosomes """
+    rows = np.arange(len(chromosomes))[:, np.newaxis]
+    return chromosomes[rows, columns]
+
+
+def _rotate_windows(chromosomes, low, high, shift):
+    """ Rotates window [low, high) of each row left by shift """
+    columns = np.arange(chromosomes.shape[1])
+    low, high, shift = low[:, np.newaxis], high[:, np.newaxis], shift[:, np.newaxis]
+    in_window = (columns >= low) & (columns < high)
+    rotated = low + (columns - low + shift) % np.maximum(high - low, 1)
+    return _permute_rows(chromosomes, np.where(in_window, rotated, columns))
+
+
+def _swap_columns(chromosomes, index1, index2):
+    rows = np.arange(len(chromosomes))
+    values1 = chromosomes[rows, index1]
+    chromosomes[rows, index1] = chromosomes[rows, index2]
+    chromosomes[rows, index2] = values1
+
+
+@batch_operator
+def adjacent_swap_mutation(chromosomes):
+    k, n = chromosomes.shape
+    index1 = np.random.randint(0, n - 1, k)
+    _swap_columns(chromosomes, index1, index1 + 1)
+    return chromosomes
+
+
+@batch_operator
+def insertion_mutation(chromosomes):
+    k, n = chromosomes.shape
+    selected = np.random.random_sample((k, n)) < 0.5
+    first_selected = np.argmax(selected, axis=1)[:, np.newaxis]
+
+    # preceding - 0, selected - 1, remaining - 2, stable sort keeps the order within each group
+    columns = np.arange(n)
+    group = np.where(selected, 1, np.where(columns < first_selected, 0, 2))
+    return _permute_rows(chromosomes, np.argsort(group, axis=1, kind='mergesort'))
+
+
+@batch_operator
+def inversion_mutation(chromosomes):
+    k, n = chromosomes.shape
+    max_swath_size = int(n * 0.6)
+
+    a, b = _distinct_pairs(k, np.zeros(k, dtype=np.int64), np.full(k, n - 1, dtype=np.int64))
+    a, b = np.minimum(a, b), np.maximum(a, b)
+    b = np.minimum(b, a + max_swath_size)
+
+    columns = np.arange(n)
+    a_, b_ = a[:, np.newaxis], b[:, np.newaxis]
+    in_swath = (columns >= a_) & (columns < b_)
+    return _permute_rows(chromosomes, np.where(in_swath, a_ + b_ - 1 - columns, columns))
+
+
+@batch_operator
+def random_slide_mutation(chromosomes):
+    k, n = chromosomes.shape
+    ones = np.ones(k, dtype=np.int64)
+    swath_size = _randint(ones, ones * int(n * 0.6))
+    left = np.random.randint(0, 2, k) == 0
+
+    # left slide moves [a, b] to x, which rotates window [x, b] left by a - x
+    a = _randint(ones, n - swath_size)
+    slide_length = _randint(ones, a)
+    left_low, left_high, left_shift = a - slide_length, a + swath_size, slide_length
+
+    # right slide moves [b + 1, y] in front of [a, b], which rotates window [a, y] left by swath size
+    b = _randint(swath_size - 1, ones * (n - 2))
+    slide_length = _randint(ones, n - b - 1)
+    right_low, right_high, right_shift = b - swath_size + 1, b + slide_length + 1, swath_size
+
+    return _rotate_windows(chromosomes,
+                           np.where(left, left_low, right_low),
+                           np.where(left, left_high, right_high),
+                           np.where(left, left_shift, right_shift))
+
+
+@batch_operator
+def random_swap_mutation(chromosomes):
+    k, n = chromosomes.shape
+    a, b = _distinct_pairs(k, np.zeros(k, dtype=np.int64), np.full(k, n - 1, dtype=np.int64))
+    a, b = np.minimum(a, b), np.maximum(a, b)
+    swath_size = _randint(np.zeros(k, dtype=np.int64), np.minimum(b - a, n - b))
+
+    # swaps [a, a + swath_size) with [b, b + swath_size)
+    columns = np.arange(n)
+    a, b, swath_size = a[:, np.newaxis], b[:, np.newaxis], swath_size[:, np.newaxis]
+    first = (columns >= a) & (columns < a + swath_size)
+    second = (columns >= b) & (columns < b + swath_size)
+    return _permute_rows(chromosomes, np.where(first, columns - a + b, np.where(second, columns - b + a, columns)))
+
+
+@batch_operator
+def scramble_mutation(chromosomes):
+    k, n = chromosomes.shape
+    swath_size = _randint(np.full(k, 2, dtype=np.int64), np.full(k, n - 1, dtype=np.int64))
+    a = _randint(np.zeros(k, dtype=np.int64), n - swath_size - 1)
+    b = a + swath_size
+
+    # swap number t is done in all rows, which have swath longer than t
+    for swap in xrange(swath_size.max()):
+        rows = np.flatnonzero(swath_size > swap)
+        index1, index2 = _distinct_pairs(len(rows), a[rows], b[rows])
+        values1 = chromosomes[rows, index1]
+        chromosomes[rows, index1] = chromosomes[rows, index2]
+        chromosomes[rows, index2] = values1
+
+    return chromosomes
+
+
+@batch_operator
+def single_swap_mutation(chromosomes):
+    k, n = chromosomes.shape
+    index1, index2 = _distinct_pairs(k, np.zeros(k, dtype=np.int64), np.full(k, n - 1, dtype=np.int64))
+    _swap_columns(chromosomes, index1, index2)
+    return chromosomes
@@ -0,0 +1,93 @@
+""" Samplers of indices with probability proportional to given weights. A sampler is built once for a list
+    of weights, after that all picks are cheaper than a linear scan over the weights.
+"""
+import random
+from bisect import bisect_right
+
+
+class PrefixSumSampler(object):
+    """ Binary search over prefix sums of weights: O(n) to build, O(log n) per pick.
+        Draws exactly like a linear cumulative scan (random.uniform(0, weights sum) for each pick).
+    """
+
+    def __init__(self, weights):
+        self.prefix_sums = list()
+        weights_sum = 0
+        for weight in weights:
+            weights_sum += weight
+            self.prefix_sums.append(weights_sum)
+        self.weights_sum = weights_sum
+
+    def sample(self, k):
+        result = list()
+        for _ in xrange(k):
+            index = bisect_right(self.prefix_sums, random.uniform(0, self.weights_sum))
+            # pick equal to the sum of weights (or all weights zero) selects nothing, just like the linear scan
+            if index < len(self.prefix_sums):
+                result.append(index)
+        return result
+
+
+class AliasSampler(object):
+    """ Walker's alias method (Vose's variant): O(n) to build, O(1) per pick """
+
+    def __init__(self, weights):
+        n = len(weights)
+        weights_sum = float(sum(weights))
+        self.probability = [1.0] * n
+        self.alias = range(n)
+        if not weights_sum:
+            return
+
+        scaled = [weight * n / weights_sum for weight in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        # leftovers differ from 1 only by rounding errors
+        for i in small + large:
+            self.probability[i] = 1.0
+
+    def sample(self, k):
+        n = len(self.alias)
+        result = list()
+        for _ in xrange(k):
+            index = int(random.random() * n)
+            result.append(index if random.random() < self.probability[index] else self.alias[index])
+        return result
+
+
+class StochasticUniversalSampler(PrefixSumSampler):
+    """ Stochastic universal sampling: k equally spaced pointers with a single random offset, O(n + k) for k picks.
+        Each index is picked either floor or ceil of its expected number of times. Picks are returned shuffled.
+    """
+
+    def sample(self, k):
+        if not k or not self.weights_sum:
+            return list()
+
+        step = float(self.weights_sum) / k
+        pointer = random.uniform(0, step)
+        result = list()
+        index = 0
+        for _ in xrange(k):
+            while index < len(self.prefix_sums) - 1 and self.prefix_sums[index] <= pointer:
+                index += 1
+            result.append(index)
+            pointer += step
+        random.shuffle(result)
+        return result
+
+
+SAMPLERS = {
+    "prefix_sums": PrefixSumSampler,
+    "alias": AliasSampler,
+    "sus": StochasticUniversalSampler,
+}
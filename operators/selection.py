@@ -1,25 +1,18 @@
 import random
 
 from heapq import nlargest
+from sampling import PrefixSumSampler
 from utils import _tuple_to_chromosome, _tuple_to_score, sort_extract
 
 
-def _roulette_select(weighted_population, k):
-    """ Returns k individual with probability proportional to assigned weights """
+def _roulette_select(weighted_population, k, sampler=PrefixSumSampler):
+    """ Returns k individual with probability proportional to assigned weights
 
-    weights_sum = sum(fitness for _, fitness in weighted_population)
-
-    result = list()
-    for _ in xrange(k):
-        pick = random.uniform(0, weights_sum)
-        current = 0
-        for p, fitness in weighted_population:
-            current += fitness
-            if current > pick:
-                result.append(p)
-                break
+    :param sampler: class from sampling module, built once for all k picks
+    """
 
-    return result
+    indexes = sampler([fitness for _, fitness in weighted_population]).sample(k)
+    return [weighted_population[index][0] for index in indexes]
 
 
 def tournament_selection(population, k):
@@ -44,23 +37,25 @@ def tournament_selection(population, k):
     return result
 
 
-def roulette_wheel_selection(population, k):
+def roulette_wheel_selection(population, k, sampler=PrefixSumSampler):
     """
 
     :param population: list of tuples (chromosome, AlgoScore)
     :param k: number of individuals to be selected from population
+    :param sampler: class from sampling module
     :return:
     """
 
     population_with_fitness_extracted = map(lambda (ch, algoscore): (ch, algoscore.to_fitness()), population)
-    return _roulette_select(population_with_fitness_extracted, k)
+    return _roulette_select(population_with_fitness_extracted, k, sampler)
 
 
-def rank_selection(population, k):
+def rank_selection(population, k, sampler=PrefixSumSampler):
     """
 
     :param population: list of chromosomes
     :param k: number of individuals to be selected from population
+    :param sampler: class from sampling module
     :return:
     """
 
@@ -69,4 +64,4 @@ def rank_selection(population, k):
 
     population_with_rank = zip(sorted_by_fitness, ranks)
 
-    return _roulette_select(population_with_rank, k)
+    return _roulette_select(population_with_rank, k, sampler)
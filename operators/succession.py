@@ -1,23 +1,14 @@
 import random
+from sampling import PrefixSumSampler
 from utils import sort, _tuple_to_score
 from frameworks import find_n_best_solutions
 
 
-def rank_succession(population, k):
-    weights_sum = sum(algoscore.to_fitness() for _, algoscore in population)
+def rank_succession(population, k, sampler=PrefixSumSampler):
     sorted_population = sort(population)
 
-    result = list()
-    for _ in xrange(k):
-        pick = random.uniform(0, weights_sum)
-        current = 0
-        for t in sorted_population:
-            current += _tuple_to_score(t)
-            if current > pick:
-                result.append(t)
-                break
-
-    return result
+    indexes = sampler(map(_tuple_to_score, sorted_population)).sample(k)
+    return [sorted_population[index] for index in indexes]
 
 
 def best(population, k):
@@ -3,7 +3,7 @@ from operators.crossover import cycle_crossover
 from operators.mutation import inversion_mutation
 from operators.selection import tournament_selection
 from operators.succession import best_then_uniform_succession
-from simulation import simulation
+from simulation import simulation_score
 import random
 
 
@@ -15,8 +15,7 @@ if __name__ == '__main__':
     graph = Graph.from_file(graph_file)
 
     def fitness(specimen):
-        _, score = simulation(graph, specimen, ff_per_step)
-        return score.nodes_saved
+        return simulation_score(graph, specimen, ff_per_step).nodes_saved
 
     def evaluate(population):
         return [(specimen, fitness(specimen)) for specimen in population]
@@ -0,0 +1,99 @@
+import numpy as np
+
+
+class PopulationMatrix(object):
+    """ Population kept as a 2D int32 array, one specimen (permutation of node ids) per row, with parallel list
+        of AlgoScores and vector of their fitnesses. It takes capacity * nodes_number * 4 bytes
+        and selecting specimens (i.e. elites in succession) is a single fancy indexing of the rows.
+
+        It can be used in place of list((specimen, AlgoScore)) - iterating, indexing and len behave the same,
+        specimens are then rows of the matrix (views, not copies). Operators wrapped with operator_adapter work
+        with row indices and the fitness vector instead.
+
+        Rows are kept in a buffer with room for `capacity` specimens. Selections made with take keep the capacity
+        of the matrix they were taken from, so once the population grew to its size with offspring, extend just
+        fills the free rows instead of copying the whole matrix every generation.
+
+    Attributes
+        specimens: int32 array of shape (population_size, nodes_number), view of the first rows of the buffer
+        scores: list(AlgoScore)
+        fitness: float64 array of fitnesses of scores
+    """
+
+    def __init__(self, specimens, scores, fitness=None):
+        if fitness is None:
+            fitness = np.fromiter((score.to_fitness() for score in scores), dtype=np.float64, count=len(scores))
+        self._specimens = specimens
+        self._fitness = fitness
+        self.scores = scores
+
+    @property
+    def specimens(self):
+        return self._specimens[:len(self.scores)]
+
+    @property
+    def fitness(self):
+        return self._fitness[:len(self.scores)]
+
+    @property
+    def capacity(self):
+        return len(self._specimens)
+
+    @staticmethod
+    def from_population(population):
+        """ :param population: list((specimen, AlgoScore)), all specimens of the same length """
+        specimens, scores = zip(*population) if population else ((), ())
+        return PopulationMatrix(np.array(specimens, dtype=np.int32, ndmin=2), list(scores))
+
+    def take(self, indices):
+        """ :return: PopulationMatrix of the specimens at given row indices (repetitions allowed),
+            with the same capacity as this one
+        """
+        indices = np.asarray(indices, dtype=np.intp)
+        capacity = max(len(indices), self.capacity)
+        specimens = np.empty((capacity,) + self._specimens.shape[1:], dtype=np.int32)
+        fitness = np.empty(capacity, dtype=np.float64)
+        np.take(self.specimens, indices, axis=0, out=specimens[:len(indices)])
+        np.take(self.fitness, indices, out=fitness[:len(indices)])
+        return PopulationMatrix(specimens, [self.scores[index] for index in indices], fitness)
+
+    def extend(self, scored_specimens):
+        """ Appends list((specimen, AlgoScore)) at once """
+        if not scored_specimens:
+            return
+        new = PopulationMatrix.from_population(scored_specimens)
+        start, end = len(self.scores), len(self.scores) + len(new)
+        if end > self.capacity:
+            self._grow(end)
+        self._specimens[start:end] = new.specimens
+        self._fitness[start:end] = new.fitness
+        self.scores.extend(new.scores)
+
+    def _grow(self, capacity):
+        specimens = np.empty((capacity,) + self._specimens.shape[1:], dtype=np.int32)
+        fitness = np.empty(capacity, dtype=np.float64)
+        specimens[:len(self)] = self.specimens
+        fitness[:len(self)] = self.fitness
+        self._specimens, self._fitness = specimens, fitness
+
+    def indexed(self):
+        """ list((row index, AlgoScore)), specimens of population operators stand for rows of the matrix """
+        return zip(xrange(len(self.scores)), self.scores)
+
+    def sorted(self):
+        """ :return: PopulationMatrix sorted by fitness desc """
+        return self.take(np.argsort(-self.fitness, kind='mergesort'))
+
+    def fitness_sum(self):
+        return float(self.fitness.sum())
+
+    def __len__(self):
+        return len(self.scores)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return zip(self.specimens[index], self.scores[index])
+        return self.specimens[index], self.scores[index]
+
+    def __iter__(self):
+        return iter(zip(self.specimens, self.scores))
@@ -1,99 +1,228 @@
-from logging import getLogger
+from bisect import bisect_right
+from logging import getLogger, INFO
 
-from graph import NodeState
+import numpy as np
+
+from graph import NodeState, UNTOUCHED, DEFENDED, BURNING
 
 logger = getLogger("simulation")
 
 
 class Score(object):
-    def __init__(self, putting_out_time, nodes_saved, nodes_occupied_by_ff):
+    def __init__(self, putting_out_time, nodes_saved, nodes_occupied_by_ff, read_length=None, pruned=False):
         # in iterations
         self.putting_out_time = putting_out_time
         self.nodes_saved = nodes_saved
         self.nodes_occupied_by_ff = nodes_occupied_by_ff
+        # number of leading solution entries the simulation has read, the rest can't affect the score
+        self.read_length = read_length
+        # simulation was aborted, nodes_saved is only an upper bound below the requested threshold
+        self.pruned = pruned
 
     def __str__(self):
-        return "[T: {}, SAVED: {}, SAVED_FF: {}]".format(self.putting_out_time, self.nodes_saved,
-                                                         self.nodes_occupied_by_ff)
+        return "[T: {}, SAVED: {}{}, SAVED_FF: {}]".format(self.putting_out_time, "<=" if self.pruned else "",
+                                                           self.nodes_saved, self.nodes_occupied_by_ff)
+
+
+class Trace(object):
+    """ Compact record of a finished simulation. It allows to resume the simulation of a similar solution
+        from the last step, that both solutions share, instead of simulating it from scratch.
+
+    Attributes
+        final_state: node states at the end of the simulation
+        change_time: step in which each node was defended or ignited (0 - initial fire), more than the number
+            of steps for nodes that stayed untouched; stored in the smallest sufficient integer type
+        solution_indexes: solution_index after each step (the first one is before the first step)
+        solution_prefix: solution entries read by the simulation
+    """
+
+    def __init__(self, final_state, change_time, solution_indexes, solution_prefix):
+        never = len(solution_indexes)
+        self.final_state = final_state
+        self.change_time = np.minimum(change_time, never).astype(np.min_scalar_type(never))
+        self.solution_indexes = solution_indexes
+        self.solution_prefix = solution_prefix
+        self.read_lengths = [0] + [min(index + 1, len(solution_prefix)) for index in solution_indexes[1:]]
+
+    def shared_steps(self, solution):
+        """ Number of steps which simulation of the solution would do exactly like the traced one """
+        prefix = self.solution_prefix[:len(solution)]
+        differences = np.flatnonzero(np.asarray(solution[:len(prefix)]) != prefix)
+        common_length = differences[0] if differences.size else len(prefix)
+        return bisect_right(self.read_lengths, common_length) - 1
+
+    def state_after(self, step):
+        return np.where(self.change_time <= step, self.final_state, UNTOUCHED).astype(np.uint8)
 
+    def ignited_in(self, step):
+        return np.flatnonzero((self.change_time == step) & (self.final_state == BURNING))
 
-def set_initial_nodes_on_fire(graph, transitions):
-    # we will store initial fire in the very first element
-    transitions[0] = list()
-    for init_node in graph.get_init_nodes():
-        graph.set_node_as_burning(init_node)
-        transitions[0].append((init_node.id, NodeState.BURNING))
 
-    return transitions
+def set_initial_nodes_on_fire(graph, state):
+    state[graph.init_nodes_ids] = BURNING
+    return threatened_nodes(graph, state, graph.init_nodes_ids)
 
 
-def spreading_finished(graph):
-    burning_nodes = graph.get_burning_nodes()
-    for burning_node in burning_nodes:
-        for neighbor in burning_node.get_neighbors():
-            if neighbor.state == NodeState.UNTOUCHED:
-                return False
-    return True
+def threatened_nodes(graph, state, ignited):
+    """ Untouched neighbors of freshly ignited nodes, the only ones that can catch fire in the next step.
+        Nodes ignited earlier have no untouched neighbors left, so an empty result means the spreading finished.
+    """
+    neighbors = graph.neighbors_of(ignited)
+    return neighbors[state[neighbors] == UNTOUCHED]
 
 
-def assign_firefighters(graph, solution, solution_index, n, transitions):
-    step = transitions.keys()[-1] + 1
-    transitions[step] = list()
+def assign_firefighters(state, solution, solution_index, n, defended=None):
+    """ Defends up to n untouched nodes, taking them in the solution order starting at solution_index.
+        Ids of the defended nodes are appended to `defended` if it is given.
 
+    :return: index in solution to continue from in the next step
+    """
     placed_ff = 0
-    while placed_ff < n and solution_index < graph.nodes_number:
-        if graph.nodes[solution[solution_index]].state == NodeState.UNTOUCHED:
-            graph.nodes[solution[solution_index]].state = NodeState.DEFENDED
-            transitions[step].append((solution[solution_index], NodeState.DEFENDED))
+    while placed_ff < n and solution_index < len(solution):
+        node_id = solution[solution_index]
+        if state[node_id] == UNTOUCHED:
+            state[node_id] = DEFENDED
+            if defended is not None:
+                defended.append(node_id)
             placed_ff += 1
         else:
             solution_index += 1
-    return solution_index, transitions
+    return solution_index
 
 
-def spread_fire(graph, transitions):
-    step = transitions.keys()[-1] + 1
-    transitions[step] = list()
+def spread_fire(graph, state, threatened):
+    """ One step of the fire: it spreads only from the nodes, that were burning at the start of the step, to their
+        untouched neighbors. The original engine iterated the list of burning nodes while appending to it,
+        so the fire took the whole reachable component in a single step and only the first ff_per_step
+        firefighters of a solution ever mattered; scores (and fitness values) of the two engines differ.
 
-    burning_nodes = graph.get_burning_nodes()
-    for burning_node in burning_nodes:
-        for neighbor in burning_node.get_neighbors():
-            if neighbor.state == NodeState.UNTOUCHED:
-                graph.set_node_as_burning(neighbor)
-                transitions[step].append((neighbor.id, NodeState.BURNING))
+    :return: ignited nodes, nodes threatened in the next step
+    """
+    # some of the threatened nodes may have been defended in the meantime
+    ignited = np.unique(threatened[state[threatened] == UNTOUCHED])
+    state[ignited] = BURNING
 
-    return transitions
+    return ignited, threatened_nodes(graph, state, ignited)
 
 
-def evaluate_result(graph):
-    saved_ff = 0
-    saved_no_ff = 0
-    for node in graph.nodes.values():
-        if node.state != NodeState.BURNING:
-            if node.state == NodeState.DEFENDED:
-                saved_ff += 1
-            else:
-                saved_no_ff += 1
-    return saved_ff, saved_no_ff
+def saved_upper_bound(nodes_number, burned, threatened_count, ff_per_step):
+    """ Maximum number of nodes that can still be saved. At most ff_per_step of the threatened nodes
+        can be defended before they catch fire, all the others are lost along with the burned ones.
+    """
+    return nodes_number - burned - np.maximum(threatened_count - ff_per_step, 0)
 
 
-def simulation(graph, solution, ff_per_step):
-    # save nodes transitions to visualize the process
-    transitions = dict()
-    graph.reset_state()
+def evaluate_result(state):
+    saved_ff = np.count_nonzero(state == DEFENDED)
+    saved_no_ff = np.count_nonzero(state == UNTOUCHED)
+    return saved_ff, saved_no_ff
 
-    transitions = set_initial_nodes_on_fire(graph, transitions)
 
-    solution_index = 0
-    iterations = 0
-    while not spreading_finished(graph):
-        solution_index, transitions = assign_firefighters(graph, solution, solution_index, ff_per_step, transitions)
-        transitions = spread_fire(graph, transitions)
+def _simulate(graph, solution, ff_per_step, state=None, transitions=None, trace=False, parent_trace=None,
+              threshold=None):
+    """ Runs the simulation, node transitions of every step are stored in `transitions` only if it is given.
+
+        The graph is only read, all the per-run node states live in `state` - a buffer private to the run.
+        It is allocated here unless the caller passes one to reuse (its content is overwritten).
+
+        If parent_trace is given, steps shared with the traced run are restored from it instead of simulated.
+
+        If threshold is given, the simulation is aborted as soon as it is certain that less than threshold nodes
+        will be saved. Score is then marked as pruned and holds the upper bound (no trace is returned).
+
+    :return: Score, Trace (if trace was requested, None otherwise)
+    """
+    if state is None:
+        state = graph.new_state()
+
+    if parent_trace is None:
+        state.fill(UNTOUCHED)
+        threatened = set_initial_nodes_on_fire(graph, state)
+        solution_index = 0
+        iterations = 0
+    else:
+        iterations = parent_trace.shared_steps(solution)
+        state[:] = parent_trace.state_after(iterations)
+        threatened = threatened_nodes(graph, state, parent_trace.ignited_in(iterations))
+        solution_index = parent_trace.solution_indexes[iterations]
+
+    if transitions is not None:
+        # we will store initial fire in the very first element
+        transitions[0] = [(node_id, NodeState.BURNING) for node_id in graph.init_nodes_ids.tolist()]
+    if trace:
+        never = np.iinfo(np.int32).max
+        if parent_trace is None:
+            change_time = np.full(graph.nodes_number, never, dtype=np.int32)
+            change_time[graph.init_nodes_ids] = 0
+            solution_indexes = [solution_index]
+        else:
+            change_time = np.where(parent_trace.change_time <= iterations, parent_trace.change_time, never)
+            solution_indexes = parent_trace.solution_indexes[:iterations + 1]
+
+    if threshold is not None:
+        burned = np.count_nonzero(state == BURNING)
+
+    pruned = False
+    while threatened.size:
+        if threshold is not None:
+            upper_bound = saved_upper_bound(graph.nodes_number, burned, np.unique(threatened).size, ff_per_step)
+            if upper_bound < threshold:
+                pruned = True
+                break
+        defended = list() if transitions is not None or trace else None
+        solution_index = assign_firefighters(state, solution, solution_index, ff_per_step, defended)
+        ignited, threatened = spread_fire(graph, state, threatened)
+        if transitions is not None:
+            transitions[2 * iterations + 1] = [(node_id, NodeState.DEFENDED) for node_id in defended]
+            transitions[2 * iterations + 2] = [(node_id, NodeState.BURNING) for node_id in ignited.tolist()]
         iterations += 1
-    logger.info("It took {} iterations for the fire to stop spreading".format(iterations))
+        if threshold is not None:
+            burned += ignited.size
+        if trace:
+            change_time[defended] = iterations
+            change_time[ignited] = iterations
+            solution_indexes.append(solution_index)
 
-    saved_ff, saved_no_ff = evaluate_result(graph)
-    all_saved = saved_ff + saved_no_ff
-    logger.info("Result: {} (saved nodes, from them {} occupied by firefighters)".format(all_saved, saved_ff))
+    # the entry at solution_index was read as well, unless the solution has been exhausted
+    read_length = min(solution_index + 1, len(solution)) if iterations else 0
 
-    return transitions, Score(iterations, all_saved, saved_ff)
+    saved_ff, saved_no_ff = evaluate_result(state)
+    all_saved = int(upper_bound) if pruned else saved_ff + saved_no_ff
+    if pruned:
+        logger.info("Aborted after {} iterations, at most {} nodes can be saved".format(iterations, all_saved))
+    elif logger.isEnabledFor(INFO):
+        logger.info("It took {} iterations for the fire to stop spreading".format(iterations))
+        logger.info("Result: {} (saved nodes, from them {} occupied by firefighters)".format(all_saved, saved_ff))
+
+    score = Score(iterations, all_saved, saved_ff, read_length, pruned)
+    if not trace or pruned:
+        return score, None
+    return score, Trace(state.copy(), change_time, solution_indexes,
+                        np.asarray(solution[:read_length], dtype=np.int32))
+
+
+def simulation_score(graph, solution, ff_per_step, state=None, threshold=None):
+    """ Fast variant of simulation, that computes only the score.
+        Doesn't modify the graph, so it can be run concurrently for the same graph,
+        as long as concurrent runs don't share the `state` buffer.
+
+    :param threshold: number of saved nodes, the run is aborted once it can't reach it (see Score.pruned)
+    """
+    score, _ = _simulate(graph, solution, ff_per_step, state, threshold=threshold)
+    return score
+
+
+def simulation_trace(graph, solution, ff_per_step, parent_trace=None, threshold=None):
+    """ Variant of simulation_score, that also records a Trace of the run (None if the run was pruned).
+        If trace of a similar solution (i.e. its parent) is given, only the steps that differ are simulated.
+
+    :return: Score, Trace
+    """
+    return _simulate(graph, solution, ff_per_step, trace=True, parent_trace=parent_trace, threshold=threshold)
+
+
+def simulation(graph, solution, ff_per_step):
+    # save nodes transitions to visualize the process
+    transitions = dict()
+    score, _ = _simulate(graph, solution, ff_per_step, transitions=transitions)
+    return transitions, score
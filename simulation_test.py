@@ -0,0 +1,77 @@
+""" Checks the simulation engines against simulation.simulation (the one recording node transitions): scores
+    of the sequential, bitset and batch simulations, and of simulations resumed from the trace of a parent,
+    have to be the same for random graphs and solutions, also when they are aborted below a threshold.
+"""
+import random
+
+import batch_simulation
+import bitset_simulation
+from generate import generate_graph
+from graph import Graph
+from simulation import simulation, simulation_score, simulation_trace
+
+
+def _score_tuple(score):
+    return score.putting_out_time, score.nodes_saved, score.nodes_occupied_by_ff, score.read_length, score.pruned
+
+
+def _random_graph():
+    vertices = random.randint(2, 200)
+    # the generator needs density of at least 2 / vertices for a connected graph
+    density = min(1.0, random.uniform(2.0, 6.0) / vertices)
+    vertices, edges, starting_vertices = generate_graph(vertices, density, random.randint(1, min(3, vertices)))
+    return Graph.from_edges(vertices, edges[:, 0], edges[:, 1], starting_vertices)
+
+
+def _mutant(solution):
+    mutant = list(solution)
+    for _ in xrange(random.randint(1, 3)):
+        i, j = random.randrange(len(mutant)), random.randrange(len(mutant))
+        mutant[i], mutant[j] = mutant[j], mutant[i]
+    return mutant
+
+
+def _check_engines(graph, ff_per_step, solutions, threshold=None):
+    batch_scores = batch_simulation.simulation_scores(graph, solutions, ff_per_step, threshold)
+    for solution, batch_score in zip(solutions, batch_scores):
+        _, score = simulation(graph, solution, ff_per_step)
+        exact = _score_tuple(score)
+        expected = _score_tuple(simulation_score(graph, solution, ff_per_step, threshold=threshold))
+        assert threshold is not None or expected == exact, "simulation_score differs from simulation for {}".format(
+            solution)
+
+        parent = _mutant(solution)
+        _, parent_trace = simulation_trace(graph, parent, ff_per_step)
+        scores = [
+            ('bitset simulation', bitset_simulation.simulation_score(graph, solution, ff_per_step, threshold)),
+            ('batch simulation', batch_score),
+            ('traced simulation', simulation_trace(graph, solution, ff_per_step, threshold=threshold)[0]),
+            ('resumed simulation', simulation_trace(graph, solution, ff_per_step, parent_trace, threshold)[0]),
+        ]
+        for name, engine_score in scores:
+            actual = _score_tuple(engine_score)
+            if name == 'resumed simulation' and actual != expected and expected[-1]:
+                # steps restored from the trace aren't checked against the threshold, so the run may be aborted
+                # later or finish, but it can't hide a score reaching the threshold
+                assert actual == exact or engine_score.pruned and engine_score.nodes_saved < threshold, \
+                    "resumed simulation gives {} instead of {} for {}".format(actual, expected, solution)
+                continue
+            assert actual == expected, "{} gives {} instead of {} for {}".format(name, actual, expected, solution)
+
+
+if __name__ == '__main__':
+
+    random.seed(1)
+    for _ in xrange(200):
+        graph = _random_graph()
+        ff_per_step = random.randint(1, 3)
+        solutions = list()
+        for _ in xrange(random.randint(1, 8)):
+            solution = range(graph.nodes_number)
+            random.shuffle(solution)
+            solutions.append(solution)
+
+        _check_engines(graph, ff_per_step, solutions)
+        _check_engines(graph, ff_per_step, solutions, threshold=random.randint(0, graph.nodes_number))
+
+    print "All simulation engines give the same scores"
@@ -1,11 +1,14 @@
 import argparse
 
-from frameworks import Operators, AlgoIn, ga_framework, DEFAULTS, random_population, strip_score
-from generate import load_graph
-from graph import Graph
+from fitness_cache import FitnessCache
+from frameworks import Operators, AlgoIn, ga_framework, DEFAULTS, random_population, strip_score, IterBoundSC, \
+    WallClockSC, EvaluationBudgetSC, StagnationSC, TargetFitnessSC, AnySC, AllSC
+from generate import GRAPH_CACHE, load_graph
 from logging_configs import configure_logging
-from operator_adapter import wrap_crossover, wrap_mutation, wrap_selection, wrap_succession
+from operator_adapter import wrap_crossover, wrap_mutation, wrap_batch_mutation, wrap_selection, wrap_succession
 from operators import SELECTION, CROSSOVER, MUTATION, SUCCESSION
+from operators.succession import best
+from operators.utils import _tuple_to_score
 from random import sample
 
 
@@ -16,12 +19,15 @@ class ConfigurableSimpleSolver(Operators):
 
         self.population_size = population_size
         self.mutation_count = mutation_count
+        self.succession_op = succession_op
 
         if selection_op is not None:
             self.crossover_selection = wrap_selection(selection_op, 1, 2)
         if crossover_op is not None:
             self.crossover = wrap_crossover(crossover_op)
-        if mutation_op is not None:
+        if getattr(mutation_op, 'batch', False):
+            self.batch_mutation = wrap_batch_mutation(mutation_op)
+        elif mutation_op is not None:
             self.mutation = wrap_mutation(mutation_op)
         if succession_op is not None:
             self.succession = wrap_succession(succession_op, population_size)
@@ -33,19 +39,61 @@ class ConfigurableSimpleSolver(Operators):
         base_population = strip_score(es.population)
         return sample(base_population, self.mutation_count)
 
+    def survival_threshold(self, es):
+        # with best succession, a specimen worse than the whole current population is never kept
+        if self.succession_op is best and len(es.population) >= self.population_size:
+            return min(map(_tuple_to_score, es.population))
+        return None
 
-def run_framework(loggers, population_size, selection, crossover, mutation, succession, iters, ffs, graph_props=None,
-                  input_file=None):
-    configure_logging(loggers)
 
+def load_input_graph(graph_props=None, input_file=None):
+    """ Graph from input_file or generated for graph_props (vertices, density, starting vertices[, seed]),
+        both memoized in generate.GRAPH_CACHE, so repeated runs on the same graph don't load it again
+    """
     if input_file:
-        g = Graph.from_file(input_file)
+        return GRAPH_CACHE.get_file(input_file)
     elif graph_props:
-        vertices, density, starting_vertices = graph_props
-        g = load_graph(vertices, density, starting_vertices)
+        return load_graph(*graph_props)
     else:
         raise ValueError('Either graph_props or input_file must be specified')
 
+
+STOP_WHEN = {
+    "any": AnySC,
+    "all": AllSC,
+}
+
+
+def build_stop_condition(iters=None, time_limit=None, evaluations_budget=None, stagnation=None, target_fitness=None,
+                         stop_when="any"):
+    """ Given conditions combined according to stop_when, a key of STOP_WHEN. Iteration bound is one of them when
+        iters is given, or the only one (with the default number of iterations) when nothing else is.
+    """
+    conditions = list()
+    if time_limit is not None:
+        conditions.append(WallClockSC(time_limit))
+    if evaluations_budget is not None:
+        conditions.append(EvaluationBudgetSC(evaluations_budget))
+    if stagnation is not None:
+        conditions.append(StagnationSC(stagnation))
+    if target_fitness is not None:
+        conditions.append(TargetFitnessSC(target_fitness))
+    if iters is not None or not conditions:
+        conditions.insert(0, IterBoundSC(DEFAULTS['algo_iter_no'] if iters is None else iters))
+
+    if len(conditions) == 1:
+        return conditions[0]
+    return STOP_WHEN[stop_when](*conditions)
+
+
+def run_framework(loggers, population_size, selection, crossover, mutation, succession, iters, ffs, graph_props=None,
+                  input_file=None, batch_evaluation=False, fitness_cache_capacity=0, incremental_evaluation=False,
+                  workers=0, bitset_states=False, steady_state=False, stop_condition=None, population_matrix=False,
+                  checkpoint_path=None, checkpoint_interval=100, resume_from=None):
+    configure_logging(loggers)
+
+    g = load_input_graph(graph_props, input_file)
+
     operators = ConfigurableSimpleSolver(
         population_size=population_size,
         selection_op=SELECTION[selection],
@@ -56,8 +104,19 @@ def run_framework(loggers, population_size, selection, crossover, mutation, succ
     return ga_framework(AlgoIn(g,
                                operators=operators,
                                iter_no=iters,
+                               stop_condition=stop_condition,
                                ffs_per_step=ffs,
                                gather_iteration_stats=True,
+                               batch_evaluation=batch_evaluation,
+                               fitness_cache=FitnessCache(g, fitness_cache_capacity) if fitness_cache_capacity else None,
+                               incremental_evaluation=incremental_evaluation,
+                               workers=workers,
+                               bitset_states=bitset_states,
+                               steady_state=steady_state,
+                               population_matrix=population_matrix,
+                               checkpoint_path=checkpoint_path,
+                               checkpoint_interval=checkpoint_interval,
+                               resume_from=resume_from,
                                ))
 
 
@@ -75,9 +134,9 @@ if __name__ == "__main__":
                         type=int,
                         default=DEFAULTS['ffs_per_step'])
     parser.add_argument('-i', '--iters',
-                        help='number of algorithm iterations',
-                        type=int,
-                        default=DEFAULTS['algo_iter_no'])
+                        help='number of algorithm iterations; {} when no other stop condition is given, '
+                             'otherwise unbounded unless given'.format(DEFAULTS['algo_iter_no']),
+                        type=int)
     parser.add_argument('-s', '--starting_vertices',
                         help='number of starting vertices',
                         type=int,
@@ -86,6 +145,9 @@ if __name__ == "__main__":
                         help='number of vertices in graph',
                         type=int,
                         default=10)
+    parser.add_argument('-gs', '--graph_seed',
+                        help='random seed of the generated graph',
+                        type=int)
     parser.add_argument('-l', '--loggers',
                         help='configuration of loggers (i.e. graph_printing=info,benchmark_results=info)',
                         default='')
@@ -109,6 +171,55 @@ if __name__ == "__main__":
                         help='succession operator',
                         choices=SUCCESSION.keys(),
                         default=SUCCESSION.keys()[0])
+    parser.add_argument('-b', '--batch_evaluation',
+                        help='simulate all specimens scored at once together',
+                        action='store_true')
+    parser.add_argument('-fc', '--fitness_cache',
+                        help='capacity of fitness cache (total length of stored solution prefixes), 0 disables it',
+                        type=int,
+                        default=0)
+    parser.add_argument('-ie', '--incremental_evaluation',
+                        help='resume simulations of mutants from their parents, not used with batch evaluation',
+                        action='store_true')
+    parser.add_argument('-w', '--workers',
+                        help='number of processes scoring specimens in parallel, 0 - no worker processes',
+                        type=int,
+                        default=0)
+    parser.add_argument('-bs', '--bitset_states',
+                        help='keep node states of simulations packed in bitsets (less memory on large graphs)',
+                        action='store_true')
+    parser.add_argument('-ss', '--steady_state',
+                        help='children replace the worst specimens one by one, succession operator is not used',
+                        action='store_true')
+
+    parser.add_argument('-pm', '--population_matrix',
+                        help='keep population in a single int32 matrix instead of a list of specimens',
+                        action='store_true')
+    parser.add_argument('-tl', '--time_limit',
+                        help='stop after given number of seconds',
+                        type=float)
+    parser.add_argument('-eb', '--evaluations_budget',
+                        help='stop after given number of specimen evaluations',
+                        type=int)
+    parser.add_argument('-st', '--stagnation',
+                        help='stop after given number of iterations without improvement of the best specimen',
+                        type=int)
+    parser.add_argument('-tf', '--target_fitness',
+                        help='stop once a specimen reaches given fitness (fraction of saved nodes)',
+                        type=float)
+    parser.add_argument('-sw', '--stop_when',
+                        help='stop when any or all of the stop conditions (including iterations bound, see -i) are met',
+                        choices=STOP_WHEN.keys(),
+                        default='any')
+    parser.add_argument('-cp', '--checkpoint_path',
+                        help='file to save checkpoints to, {} in it is replaced with the iteration number')
+    parser.add_argument('-ci', '--checkpoint_interval',
+                        help='number of iterations between checkpoints',
+                        type=int,
+                        default=100)
+    parser.add_argument('-r', '--resume_from',
+                        help='checkpoint to continue from, run with the same graph and operators as the original one; '
+                             'stop conditions are restored from the checkpoint')
 
     args = parser.parse_args()
 
@@ -120,5 +231,17 @@ if __name__ == "__main__":
                   args.succession,
                   args.iters,
                   args.ffs,
-                  (args.vertices, args.density, args.starting_vertices),
-                  args.input_file)
+                  (args.vertices, args.density, args.starting_vertices, args.graph_seed),
+                  args.input_file,
+                  args.batch_evaluation,
+                  args.fitness_cache,
+                  args.incremental_evaluation,
+                  args.workers,
+                  args.bitset_states,
+                  args.steady_state,
+                  build_stop_condition(args.iters, args.time_limit, args.evaluations_budget, args.stagnation,
+                                       args.target_fitness, args.stop_when),
+                  args.population_matrix,
+                  args.checkpoint_path,
+                  args.checkpoint_interval,
+                  args.resume_from)
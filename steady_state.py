@@ -0,0 +1,64 @@
+from heapq import heapify, heapreplace
+
+
+class SteadyStatePopulation(object):
+    """ Population of the steady-state GA, a new specimen replaces the worst one if it's better.
+
+        Specimens are kept in a list of slots (exposed as ExecutionState.population, operators see it as a regular
+        population), with a min-heap of (fitness, tie breaker, slot index) on top of it. Replacing the worst specimen
+        reuses its slot and costs O(log n). Best specimen and sum of fitnesses are updated on each replacement,
+        so they're never recomputed over the whole population.
+
+    Attributes
+        slots: list((specimen, AlgoScore))
+        fitness_sum: sum of fitnesses of all specimens
+        best: (specimen, AlgoScore) with the highest fitness
+    """
+
+    def __init__(self, population, heap_state=None):
+        """ :param heap_state: heap_state() of the population with the same slots, to continue with exactly
+            the same order of equally fit specimens (see checkpoint module)
+        """
+        self.slots = list(population)
+        if heap_state is None:
+            self._heap = [(score.to_fitness(), index, index) for index, (_, score) in enumerate(self.slots)]
+            heapify(self._heap)
+            self._next_tie_breaker = len(self._heap)
+            self.fitness_sum = sum(fitness for fitness, _, _ in self._heap)
+            self.best = max(self.slots, key=lambda (_, score): score.to_fitness()) if self.slots else None
+        else:
+            heap, self._next_tie_breaker, self.fitness_sum, best_index = heap_state
+            self._heap = [tuple(entry) for entry in heap]
+            # the first of equally fit best specimens stays the best
+            self.best = self.slots[best_index]
+
+    @property
+    def worst_fitness(self):
+        return self._heap[0][0]
+
+    def insert(self, specimen, score):
+        """ Replaces the worst specimen with the given one, if it's better
+
+        :return: True if the specimen was inserted
+        """
+        fitness = score.to_fitness()
+        if fitness <= self.worst_fitness:
+            return False
+
+        worst_fitness, _, index = heapreplace(self._heap, (fitness, self._next_tie_breaker, self._heap[0][2]))
+        self._next_tie_breaker += 1
+        self.slots[index] = (specimen, score)
+        self.fitness_sum += fitness - worst_fitness
+        if fitness > self.best[1].to_fitness():
+            self.best = self.slots[index]
+        return True
+
+    def heap_state(self):
+        """ :return: picklable (heap entries, next tie breaker, fitness sum, slot index of the best specimen),
+            see __init__
+        """
+        best_index = next(index for index, slot in enumerate(self.slots) if slot is self.best)
+        return list(self._heap), self._next_tie_breaker, self.fitness_sum, best_index
+
+    def __len__(self):
+        return len(self.slots)